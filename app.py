@@ -1,19 +1,20 @@
 import streamlit as st
+import atexit
+import functools
 import sys
-from pathlib import Path
+import threading
 import time
+from collections import defaultdict
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from PIL import Image
-import plotly.express as px
-import plotly.graph_objects as go
 
-# Add scr directory to Python path
-sys.path.insert(0, str(Path(__file__).parent / 'scr'))
+# Add scr directory to Python path (once; Streamlit re-executes this script on every rerun)
+_SCR_DIR = str(Path(__file__).parent / 'scr')
+if _SCR_DIR not in sys.path:
+    sys.path.insert(0, _SCR_DIR)
 
 from scr.config import Config
-from scr.ingestion import DataIngestion
-from scr.graph_bulider import GraphBuilder
-from scr.pipeline import GraphRAGPipeline
 from loguru import logger
 
 # Configure page
@@ -27,11 +28,13 @@ st.set_page_config(
 # Choose UI Template (Change this variable to switch themes)
 UI_TEMPLATE = "minimalist"  # Options: "minimalist", "dark", "material", "retro"
 
+# Shared Plotly client options
+PLOTLY_CONFIG = {'displaylogo': False, 'responsive': True}
+
 # Template Styles
-if UI_TEMPLATE == "minimalist":
+_TEMPLATES = {
     # Clean Minimalist Template
-    st.markdown("""
-    <style>
+    "minimalist": """
         .main-header {
             font-size: 2.8rem;
             font-weight: 300;
@@ -152,13 +155,10 @@ if UI_TEMPLATE == "minimalist":
             font-weight: 500;
             text-align: center;
         }
-    </style>
-    """, unsafe_allow_html=True)
+    """,
 
-elif UI_TEMPLATE == "dark":
     # Dark Theme Template
-    st.markdown("""
-    <style>
+    "dark": """
         .main-header {
             font-size: 3rem;
             font-weight: bold;
@@ -280,13 +280,10 @@ elif UI_TEMPLATE == "dark":
             font-weight: 500;
             text-align: center;
         }
-    </style>
-    """, unsafe_allow_html=True)
+    """,
 
-elif UI_TEMPLATE == "material":
     # Material Design Template
-    st.markdown("""
-    <style>
+    "material": """
         .main-header {
             font-size: 2.8rem;
             font-weight: 400;
@@ -408,13 +405,10 @@ elif UI_TEMPLATE == "material":
             font-weight: 500;
             text-align: center;
         }
-    </style>
-    """, unsafe_allow_html=True)
+    """,
 
-elif UI_TEMPLATE == "retro":
     # Retro/Classic Template
-    st.markdown("""
-    <style>
+    "retro": """
         .main-header {
             font-size: 3.2rem;
             font-weight: bold;
@@ -551,8 +545,129 @@ elif UI_TEMPLATE == "retro":
             text-align: center;
             font-family: 'Courier New', monospace;
         }
-    </style>
-    """, unsafe_allow_html=True)
+    """,
+}
+
+@st.cache_data(show_spinner=False)
+def _css(name):
+    """Build the <style> block for a UI template"""
+    return f"<style>{_TEMPLATES[name]}</style>"
+
+def _inject_css():
+    """Emit the selected template's styles"""
+    # Streamlit clears any element a rerun does not re-emit, so this has to
+    # run on every rerun; _css() keeps it to a cached string lookup
+    st.markdown(_css(UI_TEMPLATE), unsafe_allow_html=True)
+
+# Per-theme inline styles for the Sample Queries section
+THEME = {
+    "minimalist": {
+        "heading": None,  # rendered with st.header
+        "subtitle": "color: #495057; font-weight: 500;",
+        "card": "background: #ffffff; color: #495057; border: 2px solid #dee2e6;",
+        "query": "font-weight: 500; color: #212529;",
+    },
+    "dark": {
+        "heading": "color: #ffffff;",
+        "subtitle": "color: #e2e8f0; font-weight: 500;",
+        "card": "background: #1a202c; color: #e2e8f0; border: 2px solid #4a5568;",
+        "query": "font-weight: 500; color: #f7fafc;",
+    },
+    "material": {
+        "heading": "color: #1976d2;",
+        "subtitle": "color: #424242; font-weight: 500;",
+        "card": "background: #ffffff; color: #424242; border: 1px solid #e0e0e0;",
+        "query": "font-weight: 500; color: #212529;",
+    },
+    "retro": {
+        "heading": "color: #8b4513; font-family: 'Courier New', monospace; text-shadow: 2px 2px 4px rgba(0,0,0,0.5);",
+        "subtitle": "color: #daa520; font-weight: bold; font-family: 'Courier New', monospace; text-shadow: 1px 1px 2px rgba(0,0,0,0.7);",
+        "card": "background: #faf0e6; color: #654321; border: 2px solid #daa520; font-family: 'Courier New', monospace;",
+        "query": "font-weight: bold; color: #8b4513;",
+    },
+}
+
+DEMO_QUERIES = [
+    ("🔥", "Show me the top 5 highest risk warehouses"),
+    ("🌊", "Which warehouses are in flood-prone areas without flood protection?"),
+    ("📊", "Compare risk levels across different zones"),
+    ("⚙️", "What warehouses have had the most breakdowns?"),
+    ("🏗️", "Show me warehouses with poor infrastructure in high-competitor markets")
+]
+
+@st.cache_data(show_spinner=False)
+def _demo_queries_html(name):
+    """Build the Sample Queries cards for a UI template as one HTML block"""
+    theme = THEME[name]
+    cards = "".join(
+        f'<div class="demo-query-card" style="{theme["card"]}">'
+        '<div style="display: flex; align-items: center;">'
+        f'<span style="font-size: 1.2rem; margin-right: 0.75rem;">{icon}</span>'
+        f'<span style="flex: 1; {theme["query"]}">{query}</span>'
+        '</div></div>'
+        for icon, query in DEMO_QUERIES
+    )
+    return f'<div class="demo-queries-container">{cards}</div>'
+
+# "How It Works" section per template: (heading HTML or None for st.header, body HTML)
+_HOW_IT_WORKS = {
+    "minimalist": (
+        None,
+        """
+        <div style="background: #ffffff; border: 2px solid #dee2e6; border-radius: 8px; padding: 2rem; margin: 1rem 0; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
+            <ol style="font-size: 1.1rem; line-height: 2; margin: 0; padding-left: 1.5rem; color: #212529;">
+                <li style="margin-bottom: 1rem;"><strong style="color: #495057;">📊 Data Ingestion:</strong> <span style="color: #6c757d;">Process FMCG warehouse data from CSV files with intelligent preprocessing</span></li>
+                <li style="margin-bottom: 1rem;"><strong style="color: #495057;">🔗 Graph Construction:</strong> <span style="color: #6c757d;">Build knowledge graph with Neo4j database connecting warehouses and relationships</span></li>
+                <li style="margin-bottom: 1rem;"><strong style="color: #495057;">🧠 Query Processing:</strong> <span style="color: #6c757d;">Convert natural language to Cypher queries using advanced AI understanding</span></li>
+                <li style="margin-bottom: 1rem;"><strong style="color: #495057;">🤖 AI Analysis:</strong> <span style="color: #6c757d;">Generate comprehensive insights using Groq LLM for risk assessment</span></li>
+                <li><strong style="color: #495057;">📋 Recommendations:</strong> <span style="color: #6c757d;">Provide actionable risk mitigation strategies with priority scoring</span></li>
+            </ol>
+        </div>
+        """
+    ),
+    "dark": (
+        '<h2 style="color: #ffffff; text-align: center; font-size: 2.2rem; margin: 2rem 0 1rem 0;">🔄 How It Works</h2>',
+        """
+        <div style="background: #1a202c; border: 2px solid #4a5568; border-radius: 8px; padding: 2rem; margin: 1rem 0; box-shadow: 0 4px 12px rgba(0,0,0,0.4);">
+            <ol style="font-size: 1.1rem; line-height: 2; margin: 0; padding-left: 1.5rem; color: #f7fafc;">
+                <li style="margin-bottom: 1rem;"><strong style="color: #63b3ed;">📊 Data Ingestion:</strong> <span style="color: #e2e8f0;">Process FMCG warehouse data from CSV files with intelligent preprocessing</span></li>
+                <li style="margin-bottom: 1rem;"><strong style="color: #63b3ed;">🔗 Graph Construction:</strong> <span style="color: #e2e8f0;">Build knowledge graph with Neo4j database connecting warehouses and relationships</span></li>
+                <li style="margin-bottom: 1rem;"><strong style="color: #63b3ed;">🧠 Query Processing:</strong> <span style="color: #e2e8f0;">Convert natural language to Cypher queries using advanced AI understanding</span></li>
+                <li style="margin-bottom: 1rem;"><strong style="color: #63b3ed;">🤖 AI Analysis:</strong> <span style="color: #e2e8f0;">Generate comprehensive insights using Groq LLM for risk assessment</span></li>
+                <li><strong style="color: #63b3ed;">📋 Recommendations:</strong> <span style="color: #e2e8f0;">Provide actionable risk mitigation strategies with priority scoring</span></li>
+            </ol>
+        </div>
+        """
+    ),
+    "material": (
+        '<h2 style="color: #1976d2; text-align: center; font-size: 2.2rem; margin: 2rem 0 1rem 0;">🔄 How It Works</h2>',
+        """
+        <div style="background: #ffffff; border-radius: 8px; padding: 2rem; margin: 1rem 0; box-shadow: 0 4px 12px rgba(0,0,0,0.15); border: 1px solid #e0e0e0;">
+            <ol style="font-size: 1.1rem; line-height: 2; margin: 0; padding-left: 1.5rem; color: #424242;">
+                <li style="margin-bottom: 1rem;"><strong style="color: #1976d2;">📊 Data Ingestion:</strong> <span style="color: #616161;">Process FMCG warehouse data from CSV files with intelligent preprocessing</span></li>
+                <li style="margin-bottom: 1rem;"><strong style="color: #1976d2;">🔗 Graph Construction:</strong> <span style="color: #616161;">Build knowledge graph with Neo4j database connecting warehouses and relationships</span></li>
+                <li style="margin-bottom: 1rem;"><strong style="color: #1976d2;">🧠 Query Processing:</strong> <span style="color: #616161;">Convert natural language to Cypher queries using advanced AI understanding</span></li>
+                <li style="margin-bottom: 1rem;"><strong style="color: #1976d2;">🤖 AI Analysis:</strong> <span style="color: #616161;">Generate comprehensive insights using Groq LLM for risk assessment</span></li>
+                <li><strong style="color: #1976d2;">📋 Recommendations:</strong> <span style="color: #616161;">Provide actionable risk mitigation strategies with priority scoring</span></li>
+            </ol>
+        </div>
+        """
+    ),
+    "retro": (
+        '<h2 style="color: #8b4513; text-align: center; font-size: 2.2rem; margin: 2rem 0 1rem 0; font-family: \'Courier New\', monospace; text-shadow: 2px 2px 4px rgba(0,0,0,0.5);">🔄 How It Works</h2>',
+        """
+        <div style="background: linear-gradient(145deg, #f5deb3, #deb887); border: 3px solid #daa520; border-radius: 0; padding: 2rem; margin: 1rem 0; box-shadow: 4px 4px 12px rgba(0,0,0,0.5);">
+            <ol style="font-size: 1.1rem; line-height: 2; margin: 0; padding-left: 1.5rem; font-family: 'Courier New', monospace; color: #654321;">
+                <li style="margin-bottom: 1rem;"><strong style="color: #8b4513;">📊 Data Ingestion:</strong> <span style="color: #654321;">Process FMCG warehouse data from CSV files with intelligent preprocessing</span></li>
+                <li style="margin-bottom: 1rem;"><strong style="color: #8b4513;">🔗 Graph Construction:</strong> <span style="color: #654321;">Build knowledge graph with Neo4j database connecting warehouses and relationships</span></li>
+                <li style="margin-bottom: 1rem;"><strong style="color: #8b4513;">🧠 Query Processing:</strong> <span style="color: #654321;">Convert natural language to Cypher queries using advanced AI understanding</span></li>
+                <li style="margin-bottom: 1rem;"><strong style="color: #8b4513;">🤖 AI Analysis:</strong> <span style="color: #654321;">Generate comprehensive insights using Groq LLM for risk assessment</span></li>
+                <li><strong style="color: #8b4513;">📋 Recommendations:</strong> <span style="color: #654321;">Provide actionable risk mitigation strategies with priority scoring</span></li>
+            </ol>
+        </div>
+        """
+    ),
+}
 
 def setup_logging():
     """Configure logging for Streamlit"""
@@ -572,29 +687,159 @@ def setup_logging():
         level="DEBUG"
     )
 
+@st.cache_resource(show_spinner=False)
+def _cache_stats():
+    """Process-wide call/miss counters for the cached helpers below"""
+    # Held as a resource because app.py globals are rebuilt on every rerun
+    return defaultdict(lambda: {'calls': 0, 'misses': 0})
+
+def _tracked(cache_decorator):
+    """Apply a Streamlit cache decorator and count calls and misses for System Status"""
+    def decorate(func):
+        @functools.wraps(func)
+        def on_miss(*args, **kwargs):
+            _cache_stats()[func.__name__]['misses'] += 1
+            return func(*args, **kwargs)
+        
+        cached = cache_decorator(on_miss)
+        
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            _cache_stats()[func.__name__]['calls'] += 1
+            return cached(*args, **kwargs)
+        
+        call.clear = cached.clear
+        return call
+    return decorate
+
+@_tracked(st.cache_resource(show_spinner=False, ttl=3600))
+def _load_ingested():
+    """Run the ingestion pipeline once and serve (df, entities) from cache on reruns"""
+    # Cached as a resource, so every session shares the same objects without
+    # a pickle round trip per hit; callers must .copy() before mutating
+    from scr.ingestion import DataIngestion
+    
+    df, entities = DataIngestion().run_pipeline()
+    
+    # Low-cardinality columns grouped/counted by the insights page
+    for col in ('zone', 'WH_capacity_size'):
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    
+    return df, entities
+
+def _session_data():
+    """DataFrame and entities for this session, loaded once and kept in session_state"""
+    if 'data_df' not in st.session_state:
+        st.session_state.data_df, st.session_state.entities = _load_ingested()
+    return st.session_state.data_df, st.session_state.entities
+
+def _reload_data():
+    """Re-run ingestion, replacing both the shared cache and this session's copy"""
+    _load_ingested.clear()
+    st.session_state.pop('data_df', None)
+    st.session_state.pop('entities', None)
+    return _session_data()
+
+@st.cache_resource(show_spinner=False)
+def _build_lock():
+    """Process-wide lock so only one session rebuilds the graph at a time"""
+    # The shared GraphBuilder keeps per-build progress and session state
+    return threading.Lock()
+
+@_tracked(st.cache_resource(show_spinner=False))
+def get_graph_builder():
+    """Shared GraphBuilder so the Neo4j driver survives reruns and sessions"""
+    from scr.graph_bulider import GraphBuilder
+    
+    Config.ensure_valid()
+    builder = GraphBuilder()
+    atexit.register(builder.close)
+    return builder
+
+@_tracked(st.cache_resource(show_spinner=False))
+def get_pipeline():
+    """Shared GraphRAGPipeline so its Neo4j driver and LLM clients are built once"""
+    from scr.pipeline import GraphRAGPipeline
+    
+    Config.ensure_valid()
+    pipeline = GraphRAGPipeline()
+    atexit.register(pipeline.close)
+    pipeline.warm_up()
+    return pipeline
+
 def initialize_graph_with_progress():
-    """Initialize graph database with progress bars"""
-    with st.spinner("🚀 Initializing Graph Database..."):
-        progress_bar = st.progress(0)
+    """Initialize graph database, reporting each step in a single status element"""
+    with st.status("🚀 Initializing Graph Database...", expanded=True) as status, _build_lock():
+        builder = get_graph_builder()
         
-        # Step 1: Data Ingestion
-        st.info("📥 Step 1: Data Ingestion")
-        progress_bar.progress(25)
-        ingestion = DataIngestion()
-        df, entities = ingestion.run_pipeline()
-        progress_bar.progress(50)
+        # Step 1: Data Ingestion, while constraints are created in the background;
+        # the existing graph is only cleared once ingestion has succeeded
+        status.update(label="📥 Step 1: Data Ingestion")
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            constraints = pool.submit(builder.create_constraints)
+            df, entities = _reload_data()
+            constraints.result()
         
         # Step 2: Graph Construction
-        st.info("🔗 Step 2: Graph Construction")
-        progress_bar.progress(75)
-        builder = GraphBuilder()
-        try:
-            builder.build_graph(entities, clear_existing=True)
-            progress_bar.progress(100)
-            st.success("✅ Graph initialization completed!")
-            return df, entities
-        finally:
-            builder.close()
+        status.update(label="🔗 Step 2: Graph Construction")
+        builder.clear_database()
+        builder.build_graph(
+            entities,
+            prepared=True,
+            progress_callback=lambda done, total: status.update(
+                label=f"🔗 Step 2: Graph Construction ({done}/{total} batches)"
+            )
+        )
+        
+        # Answers cached against the previous graph are now stale
+        get_pipeline().invalidate_cache()
+        
+        status.update(label="✅ Graph initialization completed!", state="complete")
+        return df, entities
+
+def _plot(fig):
+    """Render a Plotly figure with the app's shared chart options"""
+    # Point-based traces (px.scatter / px.line) should be built with
+    # render_mode='webgl' so large warehouse sets render on the GPU
+    return st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
+
+def _df_fingerprint(df):
+    """Content hash used as the cache key for insights DataFrames"""
+    return pd.util.hash_pandas_object(df, index=False).values.tobytes()
+
+@_tracked(st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _df_fingerprint}))
+def _zone_stats(df):
+    """Per-zone warehouse count, flood exposure and average breakdowns in one groupby pass"""
+    return df.groupby('zone', observed=True).agg(
+        count=('zone', 'size'),
+        flood=('flood_impacted', 'sum'),
+        breakdown=('wh_breakdown_l3m', 'mean')
+    )
+
+@_tracked(st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _df_fingerprint}))
+def _insight_figures(df):
+    """Build the zone and risk figures once per distinct DataFrame"""
+    import plotly.express as px
+    
+    zone_stats = _zone_stats(df)
+    
+    fig_zone = px.bar(zone_stats['count'].sort_values(ascending=False), 
+                     title="Warehouses by Zone",
+                     labels={'index': 'Zone', 'value': 'Count'},
+                     color_discrete_sequence=['#1e3c72'])
+    
+    fig_flood = px.bar(zone_stats['flood'], 
+                      title="Flood Risk by Zone",
+                      labels={'value': 'Flood-Prone Warehouses'},
+                      color_discrete_sequence=['#ff6b6b'])
+    
+    fig_breakdown = px.bar(zone_stats['breakdown'], 
+                          title="Average Breakdowns by Zone",
+                          labels={'value': 'Avg Breakdowns (3M)'},
+                          color_discrete_sequence=['#ffa726'])
+    
+    return fig_zone, fig_flood, fig_breakdown
 
 def display_data_insights(df):
     """Display data insights and visualizations"""
@@ -606,48 +851,157 @@ def display_data_insights(df):
         st.metric("Total Warehouses", len(df))
     
     with col2:
-        risk_warehouses = len(df[df['flood_impacted'] == 1])
+        risk_warehouses = int(df['flood_impacted'].eq(1).sum())
         st.metric("Flood-Prone Warehouses", risk_warehouses)
     
     with col3:
         avg_breakdowns = df['wh_breakdown_l3m'].mean()
-        st.metric("Avg Breakdowns (3M)", ".1f")
+        st.metric("Avg Breakdowns (3M)", f"{avg_breakdowns:.1f}")
     
     with col4:
-        high_capacity = len(df[df['WH_capacity_size'] == 'Large'])
+        high_capacity = int(df['WH_capacity_size'].eq('Large').sum())
         st.metric("Large Capacity WH", high_capacity)
     
+    fig_zone, fig_flood, fig_breakdown = _insight_figures(df)
+    
     # Zone distribution
     st.subheader("🏭 Warehouse Distribution by Zone")
-    zone_counts = df['zone'].value_counts()
-    fig_zone = px.bar(zone_counts, 
-                     title="Warehouses by Zone",
-                     labels={'index': 'Zone', 'value': 'Count'},
-                     color_discrete_sequence=['#1e3c72'])
-    st.plotly_chart(fig_zone, use_container_width=True)
+    _plot(fig_zone)
     
     # Risk analysis
     st.subheader("⚠️ Risk Analysis")
     col1, col2 = st.columns(2)
     
     with col1:
-        flood_risk = df.groupby('zone')['flood_impacted'].sum()
-        fig_flood = px.bar(flood_risk, 
-                          title="Flood Risk by Zone",
-                          labels={'value': 'Flood-Prone Warehouses'},
-                          color_discrete_sequence=['#ff6b6b'])
-        st.plotly_chart(fig_flood, use_container_width=True)
+        _plot(fig_flood)
+    
+    with col2:
+        _plot(fig_breakdown)
+
+class AnswerStream:
+    """Incrementally render a streamed answer
+    
+    Completed paragraphs are drawn once into their own placeholder; only the
+    trailing, still-growing paragraph is redrawn, at most every min_interval seconds.
+    """
+    
+    def __init__(self, container, min_interval: float = 0.1):
+        self.container = container
+        self.min_interval = min_interval
+        self.text = ""
+        self.blocks = []
+        self.tail = None
+        self.last_draw = 0.0
     
+    def write(self, token: str):
+        """Append a streamed chunk, redrawing if the throttle interval has passed"""
+        self.text += token
+        if time.monotonic() - self.last_draw >= self.min_interval:
+            self._draw()
+    
+    def finish(self, text: str):
+        """Draw the final answer text"""
+        # Final text that does not extend the stream (e.g. the error returned when
+        # streaming failed partway) replaces what was drawn instead of following it
+        if not text.startswith(self.text):
+            for slot in self.blocks:
+                slot.empty()
+            self.blocks = []
+        self.text = text
+        self._draw()
+    
+    def _draw(self):
+        *stable, tail = self.text.split("\n\n")
+        
+        # Promote newly completed paragraphs to fixed blocks
+        while len(self.blocks) < len(stable):
+            slot = self.tail or self.container.empty()
+            slot.markdown(stable[len(self.blocks)])
+            self.blocks.append(slot)
+            self.tail = None
+        
+        if self.tail is None:
+            self.tail = self.container.empty()
+        self.tail.markdown(tail)
+        self.last_draw = time.monotonic()
+
+@st.fragment
+def query_analyzer(pipeline):
+    """Query input and results; widget interactions rerun only this fragment"""
+    # Query input
+    st.subheader("💬 Ask Your Question")
+    query = st.text_input("Enter your warehouse risk analysis query:", 
+                        placeholder="e.g., Show me high-risk warehouses in flood zones")
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        generate_recs = st.checkbox("Generate Recommendations", value=True)
     with col2:
-        breakdown_risk = df.groupby('zone')['wh_breakdown_l3m'].mean()
-        fig_breakdown = px.bar(breakdown_risk, 
-                              title="Average Breakdowns by Zone",
-                              labels={'value': 'Avg Breakdowns (3M)'},
-                              color_discrete_sequence=['#ffa726'])
-        st.plotly_chart(fig_breakdown, use_container_width=True)
+        submit_button = st.button("🔍 Analyze", use_container_width=True)
+    
+    if submit_button and query:
+        with st.spinner("🤖 Processing your query..."):
+            try:
+                status_slot = st.empty()
+                st.markdown('<h3 class="analysis-header">🤖 AI Analysis Result</h3>', unsafe_allow_html=True)
+                
+                # Stream the answer into the page while it is generated
+                answer_stream = AnswerStream(st.container(border=True))
+                result = pipeline.process_query(
+                    query, 
+                    generate_recommendations=generate_recs,
+                    on_token=answer_stream.write
+                )
+                answer_stream.finish(result['answer'])
+                
+                status_slot.markdown('<div class="success-message">✅ Analysis Complete! 🚀</div>', unsafe_allow_html=True)
+                
+                # Display recommendations
+                if result.get('recommendations') and generate_recs:
+                    st.markdown('<h3 class="analysis-header">📋 Smart Recommendations</h3>', unsafe_allow_html=True)
+                    for rec in result['recommendations']:
+                        priority_class = f"priority-{rec['priority'].lower()}"
+                        with st.container():
+                            st.markdown(f"""
+                            <div class="recommendation-card {priority_class}">
+                                <div style="display: flex; align-items: center; margin-bottom: 1rem;">
+                                    <span style="font-size: 1.3rem; margin-right: 0.5rem;">🏭</span>
+                                    <div>
+                                        <strong style="font-size: 1.1rem; color: #2c3e50;">Warehouse: {rec['warehouse_id']}</strong><br>
+                                        <span style="background: rgba(255,255,255,0.8); padding: 0.25rem 0.5rem; border-radius: 12px; font-size: 0.9rem; font-weight: bold; color: #495057;">
+                                            Priority: {rec['priority'].upper()}
+                                        </span>
+                                    </div>
+                                </div>
+                                <div style="margin-top: 0.5rem;">
+                                    <strong style="color: #2c3e50;">Recommended Actions:</strong>
+                                    <ul style="margin-top: 0.5rem; padding-left: 1.5rem;">
+                            """, unsafe_allow_html=True)
+                            for action in rec['actions']:
+                                st.markdown(f'<li style="margin-bottom: 0.25rem; color: #495057;">{action}</li>', unsafe_allow_html=True)
+                            st.markdown("</ul></div></div>", unsafe_allow_html=True)
+                
+                # Metadata
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Results Found", result['result_count'])
+                with col2:
+                    cached_tag = " (cached)" if result['metadata'].get('cached') else ""
+                    st.metric("Processing Time", f"{result['metadata']['processing_time_seconds']:.2f}s{cached_tag}")
+                with col3:
+                    st.metric("Query Type", "GraphRAG Analysis")
+                
+                cache = pipeline.answer_generator.cache_info()
+                st.caption(f"LLM answer cache: {cache['hits']} hits, {cache['misses']} misses, {cache['size']} stored")
+                    
+            except Exception as e:
+                st.error(f"❌ Error processing query: {e}")
+                logger.error(f"Query processing error: {e}")
+
 
 def main():
     setup_logging()
+    _inject_css()
     
     # Main header
     st.markdown('<h1 class="main-header">🏭 FMCG Supply Chain GraphRAG</h1>', unsafe_allow_html=True)
@@ -668,6 +1022,11 @@ def main():
                 st.write(f"**Database:** {Config.NEO4J_DATABASE}")
             except Exception as e:
                 st.error(f"❌ Configuration Error: {e}")
+            
+            st.caption("Cache activity")
+            for name, stats in _cache_stats().items():
+                hits = stats['calls'] - stats['misses']
+                st.write(f"**{name}:** hits={hits} misses={stats['misses']}")
     
     if page == "🏠 Home":
         # Hero section
@@ -716,246 +1075,45 @@ def main():
             """, unsafe_allow_html=True)
         
         # How it works
-        if UI_TEMPLATE == "minimalist":
+        heading, body = _HOW_IT_WORKS[UI_TEMPLATE]
+        if heading is None:
             st.header("🔄 How It Works")
-            st.markdown("""
-            <div style="background: #ffffff; border: 2px solid #dee2e6; border-radius: 8px; padding: 2rem; margin: 1rem 0; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-                <ol style="font-size: 1.1rem; line-height: 2; margin: 0; padding-left: 1.5rem; color: #212529;">
-                    <li style="margin-bottom: 1rem;"><strong style="color: #495057;">📊 Data Ingestion:</strong> <span style="color: #6c757d;">Process FMCG warehouse data from CSV files with intelligent preprocessing</span></li>
-                    <li style="margin-bottom: 1rem;"><strong style="color: #495057;">🔗 Graph Construction:</strong> <span style="color: #6c757d;">Build knowledge graph with Neo4j database connecting warehouses and relationships</span></li>
-                    <li style="margin-bottom: 1rem;"><strong style="color: #495057;">🧠 Query Processing:</strong> <span style="color: #6c757d;">Convert natural language to Cypher queries using advanced AI understanding</span></li>
-                    <li style="margin-bottom: 1rem;"><strong style="color: #495057;">🤖 AI Analysis:</strong> <span style="color: #6c757d;">Generate comprehensive insights using Groq LLM for risk assessment</span></li>
-                    <li><strong style="color: #495057;">📋 Recommendations:</strong> <span style="color: #6c757d;">Provide actionable risk mitigation strategies with priority scoring</span></li>
-                </ol>
-            </div>
-            """, unsafe_allow_html=True)
-        elif UI_TEMPLATE == "dark":
-            st.markdown('<h2 style="color: #ffffff; text-align: center; font-size: 2.2rem; margin: 2rem 0 1rem 0;">🔄 How It Works</h2>', unsafe_allow_html=True)
-            st.markdown("""
-            <div style="background: #1a202c; border: 2px solid #4a5568; border-radius: 8px; padding: 2rem; margin: 1rem 0; box-shadow: 0 4px 12px rgba(0,0,0,0.4);">
-                <ol style="font-size: 1.1rem; line-height: 2; margin: 0; padding-left: 1.5rem; color: #f7fafc;">
-                    <li style="margin-bottom: 1rem;"><strong style="color: #63b3ed;">📊 Data Ingestion:</strong> <span style="color: #e2e8f0;">Process FMCG warehouse data from CSV files with intelligent preprocessing</span></li>
-                    <li style="margin-bottom: 1rem;"><strong style="color: #63b3ed;">🔗 Graph Construction:</strong> <span style="color: #e2e8f0;">Build knowledge graph with Neo4j database connecting warehouses and relationships</span></li>
-                    <li style="margin-bottom: 1rem;"><strong style="color: #63b3ed;">🧠 Query Processing:</strong> <span style="color: #e2e8f0;">Convert natural language to Cypher queries using advanced AI understanding</span></li>
-                    <li style="margin-bottom: 1rem;"><strong style="color: #63b3ed;">🤖 AI Analysis:</strong> <span style="color: #e2e8f0;">Generate comprehensive insights using Groq LLM for risk assessment</span></li>
-                    <li><strong style="color: #63b3ed;">📋 Recommendations:</strong> <span style="color: #e2e8f0;">Provide actionable risk mitigation strategies with priority scoring</span></li>
-                </ol>
-            </div>
-            """, unsafe_allow_html=True)
-        elif UI_TEMPLATE == "material":
-            st.markdown('<h2 style="color: #1976d2; text-align: center; font-size: 2.2rem; margin: 2rem 0 1rem 0;">🔄 How It Works</h2>', unsafe_allow_html=True)
-            st.markdown("""
-            <div style="background: #ffffff; border-radius: 8px; padding: 2rem; margin: 1rem 0; box-shadow: 0 4px 12px rgba(0,0,0,0.15); border: 1px solid #e0e0e0;">
-                <ol style="font-size: 1.1rem; line-height: 2; margin: 0; padding-left: 1.5rem; color: #424242;">
-                    <li style="margin-bottom: 1rem;"><strong style="color: #1976d2;">📊 Data Ingestion:</strong> <span style="color: #616161;">Process FMCG warehouse data from CSV files with intelligent preprocessing</span></li>
-                    <li style="margin-bottom: 1rem;"><strong style="color: #1976d2;">🔗 Graph Construction:</strong> <span style="color: #616161;">Build knowledge graph with Neo4j database connecting warehouses and relationships</span></li>
-                    <li style="margin-bottom: 1rem;"><strong style="color: #1976d2;">🧠 Query Processing:</strong> <span style="color: #616161;">Convert natural language to Cypher queries using advanced AI understanding</span></li>
-                    <li style="margin-bottom: 1rem;"><strong style="color: #1976d2;">🤖 AI Analysis:</strong> <span style="color: #616161;">Generate comprehensive insights using Groq LLM for risk assessment</span></li>
-                    <li><strong style="color: #1976d2;">📋 Recommendations:</strong> <span style="color: #616161;">Provide actionable risk mitigation strategies with priority scoring</span></li>
-                </ol>
-            </div>
-            """, unsafe_allow_html=True)
-        elif UI_TEMPLATE == "retro":
-            st.markdown('<h2 style="color: #8b4513; text-align: center; font-size: 2.2rem; margin: 2rem 0 1rem 0; font-family: \'Courier New\', monospace; text-shadow: 2px 2px 4px rgba(0,0,0,0.5);">🔄 How It Works</h2>', unsafe_allow_html=True)
-            st.markdown("""
-            <div style="background: linear-gradient(145deg, #f5deb3, #deb887); border: 3px solid #daa520; border-radius: 0; padding: 2rem; margin: 1rem 0; box-shadow: 4px 4px 12px rgba(0,0,0,0.5);">
-                <ol style="font-size: 1.1rem; line-height: 2; margin: 0; padding-left: 1.5rem; font-family: 'Courier New', monospace; color: #654321;">
-                    <li style="margin-bottom: 1rem;"><strong style="color: #8b4513;">📊 Data Ingestion:</strong> <span style="color: #654321;">Process FMCG warehouse data from CSV files with intelligent preprocessing</span></li>
-                    <li style="margin-bottom: 1rem;"><strong style="color: #8b4513;">🔗 Graph Construction:</strong> <span style="color: #654321;">Build knowledge graph with Neo4j database connecting warehouses and relationships</span></li>
-                    <li style="margin-bottom: 1rem;"><strong style="color: #8b4513;">🧠 Query Processing:</strong> <span style="color: #654321;">Convert natural language to Cypher queries using advanced AI understanding</span></li>
-                    <li style="margin-bottom: 1rem;"><strong style="color: #8b4513;">🤖 AI Analysis:</strong> <span style="color: #654321;">Generate comprehensive insights using Groq LLM for risk assessment</span></li>
-                    <li><strong style="color: #8b4513;">📋 Recommendations:</strong> <span style="color: #654321;">Provide actionable risk mitigation strategies with priority scoring</span></li>
-                </ol>
-            </div>
-            """, unsafe_allow_html=True)
+        else:
+            st.markdown(heading, unsafe_allow_html=True)
+        st.markdown(body, unsafe_allow_html=True)
         
         # Demo queries
-        if UI_TEMPLATE == "minimalist":
+        theme = THEME[UI_TEMPLATE]
+        if theme["heading"] is None:
             st.header("💡 Sample Queries")
-            st.markdown('<div style="text-align: center; color: #495057; margin-bottom: 1.5rem; font-size: 1.1rem; font-weight: 500;">Click on any query below to get started with your analysis</div>', unsafe_allow_html=True)
-        elif UI_TEMPLATE == "dark":
-            st.markdown('<h2 style="color: #ffffff; text-align: center; font-size: 2.2rem; margin: 3rem 0 1.5rem 0;">💡 Sample Queries</h2>', unsafe_allow_html=True)
-            st.markdown('<div style="text-align: center; color: #e2e8f0; margin-bottom: 1.5rem; font-size: 1.1rem; font-weight: 500;">Click on any query below to get started with your analysis</div>', unsafe_allow_html=True)
-        elif UI_TEMPLATE == "material":
-            st.markdown('<h2 style="color: #1976d2; text-align: center; font-size: 2.2rem; margin: 3rem 0 1.5rem 0;">💡 Sample Queries</h2>', unsafe_allow_html=True)
-            st.markdown('<div style="text-align: center; color: #424242; margin-bottom: 1.5rem; font-size: 1.1rem; font-weight: 500;">Click on any query below to get started with your analysis</div>', unsafe_allow_html=True)
-        elif UI_TEMPLATE == "retro":
-            st.markdown('<h2 style="color: #8b4513; text-align: center; font-size: 2.2rem; margin: 3rem 0 1.5rem 0; font-family: \'Courier New\', monospace; text-shadow: 2px 2px 4px rgba(0,0,0,0.5);">💡 Sample Queries</h2>', unsafe_allow_html=True)
-            st.markdown('<div style="text-align: center; color: #daa520; margin-bottom: 1.5rem; font-size: 1.1rem; font-weight: bold; font-family: \'Courier New\', monospace; text-shadow: 1px 1px 2px rgba(0,0,0,0.7);">Click on any query below to get started with your analysis</div>', unsafe_allow_html=True)
-
-        demo_queries = [
-            "Show me the top 5 highest risk warehouses",
-            "Which warehouses are in flood-prone areas without flood protection?",
-            "Compare risk levels across different zones",
-            "What warehouses have had the most breakdowns?",
-            "Show me warehouses with poor infrastructure in high-competitor markets"
-        ]
-
-        # Container for demo queries
-        st.markdown('<div class="demo-queries-container">', unsafe_allow_html=True)
-
-        for i, query in enumerate(demo_queries):
-            icon = ["🔥", "🌊", "📊", "⚙️", "🏗️"][i]  # Different icons for each query
-            if UI_TEMPLATE == "minimalist":
-                st.markdown(f"""
-                <div class="demo-query-card" style="background: #ffffff; color: #495057; border: 2px solid #dee2e6;">
-                    <div style="display: flex; align-items: center;">
-                        <span style="font-size: 1.2rem; margin-right: 0.75rem;">{icon}</span>
-                        <span style="flex: 1; font-weight: 500; color: #212529;">{query}</span>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            elif UI_TEMPLATE == "dark":
-                st.markdown(f"""
-                <div class="demo-query-card" style="background: #1a202c; color: #e2e8f0; border: 2px solid #4a5568;">
-                    <div style="display: flex; align-items: center;">
-                        <span style="font-size: 1.2rem; margin-right: 0.75rem;">{icon}</span>
-                        <span style="flex: 1; font-weight: 500; color: #f7fafc;">{query}</span>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            elif UI_TEMPLATE == "material":
-                st.markdown(f"""
-                <div class="demo-query-card" style="background: #ffffff; color: #424242; border: 1px solid #e0e0e0;">
-                    <div style="display: flex; align-items: center;">
-                        <span style="font-size: 1.2rem; margin-right: 0.75rem;">{icon}</span>
-                        <span style="flex: 1; font-weight: 500; color: #212529;">{query}</span>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            elif UI_TEMPLATE == "retro":
-                st.markdown(f"""
-                <div class="demo-query-card" style="background: #faf0e6; color: #654321; border: 2px solid #daa520; font-family: 'Courier New', monospace;">
-                    <div style="display: flex; align-items: center;">
-                        <span style="font-size: 1.2rem; margin-right: 0.75rem;">{icon}</span>
-                        <span style="flex: 1; font-weight: bold; color: #8b4513;">{query}</span>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-
-        st.markdown('</div>', unsafe_allow_html=True)
+        else:
+            st.markdown(f'<h2 style="{theme["heading"]} text-align: center; font-size: 2.2rem; margin: 3rem 0 1.5rem 0;">💡 Sample Queries</h2>', unsafe_allow_html=True)
+        st.markdown(f'<div style="text-align: center; margin-bottom: 1.5rem; font-size: 1.1rem; {theme["subtitle"]}">Click on any query below to get started with your analysis</div>', unsafe_allow_html=True)
+        st.markdown(_demo_queries_html(UI_TEMPLATE), unsafe_allow_html=True)
     
     elif page == "🔍 Query Analyzer":
         st.header("🔍 Interactive Query Analyzer")
         
         # Initialize pipeline
-        if 'pipeline' not in st.session_state:
-            with st.spinner("🔄 Initializing GraphRAG Pipeline..."):
-                try:
-                    st.session_state.pipeline = GraphRAGPipeline()
-                    st.success("✅ Pipeline ready!")
-                except Exception as e:
-                    st.error(f"❌ Pipeline initialization failed: {e}")
-                    return
-        
-        # Query input
-        st.subheader("💬 Ask Your Question")
-        query = st.text_input("Enter your warehouse risk analysis query:", 
-                            placeholder="e.g., Show me high-risk warehouses in flood zones")
-        
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            generate_recs = st.checkbox("Generate Recommendations", value=True)
-        with col2:
-            submit_button = st.button("🔍 Analyze", use_container_width=True)
+        with st.spinner("🔄 Initializing GraphRAG Pipeline..."):
+            try:
+                pipeline = get_pipeline()
+            except Exception as e:
+                st.error(f"❌ Pipeline initialization failed: {e}")
+                return
         
-        if submit_button and query:
-            with st.spinner("🤖 Processing your query..."):
-                try:
-                    result = st.session_state.pipeline.process_query(
-                        query, 
-                        generate_recommendations=generate_recs
-                    )
-                    
-                    # Display answer
-                    st.markdown('<div class="success-message">✅ Analysis Complete! 🚀</div>', unsafe_allow_html=True)
-
-                    st.markdown('<h3 class="analysis-header">🤖 AI Analysis Result</h3>', unsafe_allow_html=True)
-                    if UI_TEMPLATE == "minimalist":
-                        st.markdown(f"""
-                        <div class="answer-container">
-                            <div class="answer-content">
-                                {result['answer']}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    elif UI_TEMPLATE == "dark":
-                        st.markdown(f"""
-                        <div class="answer-container">
-                            <div class="answer-content">
-                                {result['answer']}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    elif UI_TEMPLATE == "material":
-                        st.markdown(f"""
-                        <div class="answer-container">
-                            <div class="answer-content">
-                                {result['answer']}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    elif UI_TEMPLATE == "retro":
-                        st.markdown(f"""
-                        <div class="answer-container">
-                            <div class="answer-content">
-                                {result['answer']}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Display recommendations
-                    if result.get('recommendations') and generate_recs:
-                        st.markdown('<h3 class="analysis-header">📋 Smart Recommendations</h3>', unsafe_allow_html=True)
-                        for rec in result['recommendations']:
-                            priority_class = f"priority-{rec['priority'].lower()}"
-                            with st.container():
-                                st.markdown(f"""
-                                <div class="recommendation-card {priority_class}">
-                                    <div style="display: flex; align-items: center; margin-bottom: 1rem;">
-                                        <span style="font-size: 1.3rem; margin-right: 0.5rem;">🏭</span>
-                                        <div>
-                                            <strong style="font-size: 1.1rem; color: #2c3e50;">Warehouse: {rec['warehouse_id']}</strong><br>
-                                            <span style="background: rgba(255,255,255,0.8); padding: 0.25rem 0.5rem; border-radius: 12px; font-size: 0.9rem; font-weight: bold; color: #495057;">
-                                                Priority: {rec['priority'].upper()}
-                                            </span>
-                                        </div>
-                                    </div>
-                                    <div style="margin-top: 0.5rem;">
-                                        <strong style="color: #2c3e50;">Recommended Actions:</strong>
-                                        <ul style="margin-top: 0.5rem; padding-left: 1.5rem;">
-                                """, unsafe_allow_html=True)
-                                for action in rec['actions']:
-                                    st.markdown(f'<li style="margin-bottom: 0.25rem; color: #495057;">{action}</li>', unsafe_allow_html=True)
-                                st.markdown("</ul></div></div>", unsafe_allow_html=True)
-                    
-                    # Metadata
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("Results Found", result['result_count'])
-                    with col2:
-                        st.metric("Processing Time", ".2f")
-                    with col3:
-                        st.metric("Query Type", "GraphRAG Analysis")
-                        
-                except Exception as e:
-                    st.error(f"❌ Error processing query: {e}")
-                    logger.error(f"Query processing error: {e}")
+        query_analyzer(pipeline)
     
     elif page == "📊 Data Insights":
         st.header("📊 Data Insights & Analytics")
         
         if 'data_df' not in st.session_state:
             st.info("📥 Loading data for analysis...")
-            try:
-                ingestion = DataIngestion()
-                df, _ = ingestion.run_pipeline()
-                st.session_state.data_df = df
-                display_data_insights(df)
-            except Exception as e:
-                st.error(f"❌ Error loading data: {e}")
-        else:
-            display_data_insights(st.session_state.data_df)
+        try:
+            df, _ = _session_data()
+            display_data_insights(df)
+        except Exception as e:
+            st.error(f"❌ Error loading data: {e}")
     
     elif page == "⚙️ System Setup":
         st.header("⚙️ System Setup & Initialization")
@@ -971,7 +1129,6 @@ def main():
         if st.button("🔄 Initialize/Rebuild Graph Database", type="primary"):
             try:
                 df, entities = initialize_graph_with_progress()
-                st.session_state.data_df = df
                 st.success("🎉 Graph database initialized successfully!")
                 
                 # Show initialization summary
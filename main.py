@@ -1,4 +1,6 @@
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import StringIO
 from pathlib import Path
 from loguru import logger
 
@@ -21,30 +23,43 @@ def setup_logging():
     logger.add(
         sys.stderr,
         format="<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | <level>{message}</level>",
-        level=Config.LOG_LEVEL
+        level=Config.LOG_LEVEL,
+        enqueue=True
     )
     logger.add(
         Config.LOG_FILE,
         rotation="10 MB",
         retention="7 days",
-        level="DEBUG"
+        level="DEBUG",
+        enqueue=True
     )
 
 
+def _write_stdout(buffer: StringIO):
+    """Write a buffered block of output with a single write and flush"""
+    sys.stdout.write(buffer.getvalue())
+    sys.stdout.flush()
+
+
 def initialize_graph():
     """Initialize graph database with data"""
     logger.info("🚀 Initializing graph database...")
     
-    # Step 1: Data Ingestion
-    logger.info("Step 1: Data Ingestion")
-    ingestion = DataIngestion()
-    df, entities = ingestion.run_pipeline()
-    
-    # Step 2: Graph Construction
-    logger.info("Step 2: Graph Construction")
     builder = GraphBuilder()
     try:
-        builder.build_graph(entities, clear_existing=True)
+        # Step 1: Data Ingestion, while constraints are created in the background;
+        # the existing graph is only cleared once ingestion has succeeded
+        logger.info("Step 1: Data Ingestion")
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            constraints = pool.submit(builder.create_constraints)
+            ingestion = DataIngestion()
+            df, entities = ingestion.run_pipeline()
+            constraints.result()
+        
+        # Step 2: Graph Construction
+        logger.info("Step 2: Graph Construction")
+        builder.clear_database()
+        builder.build_graph(entities, prepared=True)
     finally:
         builder.close()
     
@@ -74,24 +89,27 @@ def run_interactive_mode(pipeline: GraphRAGPipeline):
             # Process query
             result = pipeline.process_query(query, generate_recommendations=True)
             
-            # Display results
-            print("\n" + "="*60)
-            print("🤖 ANSWER:")
-            print("="*60)
-            print(result['answer'])
+            # Display results, written to stdout in one go
+            out = StringIO()
+            print("\n" + "="*60, file=out)
+            print("🤖 ANSWER:", file=out)
+            print("="*60, file=out)
+            print(result['answer'], file=out)
             
             if result.get('recommendations'):
-                print("\n📋 RECOMMENDATIONS:")
+                print("\n📋 RECOMMENDATIONS:", file=out)
                 for rec in result['recommendations']:
-                    print(f"\n  Warehouse: {rec['warehouse_id']}")
-                    print(f"  Priority: {rec['priority']}")
-                    print(f"  Actions:")
+                    print(f"\n  Warehouse: {rec['warehouse_id']}", file=out)
+                    print(f"  Priority: {rec['priority']}", file=out)
+                    print(f"  Actions:", file=out)
                     for action in rec['actions']:
-                        print(f"    - {action}")
+                        print(f"    - {action}", file=out)
             
-            print("\n" + "="*60)
-            print(f"Results: {result['result_count']} | Time: {result['metadata']['processing_time_seconds']}s")
-            print("="*60)
+            print("\n" + "="*60, file=out)
+            cached_tag = " (cached)" if result['metadata'].get('cached') else ""
+            print(f"Results: {result['result_count']} | Time: {result['metadata']['processing_time_seconds']}s{cached_tag}", file=out)
+            print("="*60, file=out)
+            _write_stdout(out)
             
         except KeyboardInterrupt:
             print("\n\nGoodbye! 👋")
@@ -115,19 +133,32 @@ def run_demo_queries(pipeline: GraphRAGPipeline):
     logger.info("🎯 Running Demo Queries")
     logger.info("="*60)
     
-    for i, query in enumerate(demo_queries, 1):
-        print(f"\n\n{'='*60}")
-        print(f"Demo Query {i}/{len(demo_queries)}: {query}")
-        print('='*60)
+    # Queries are independent and bound by Groq/Neo4j latency, so run them
+    # concurrently and print each one as it finishes
+    with ThreadPoolExecutor(max_workers=max(1, Config.BATCH_CONCURRENCY)) as pool:
+        futures = {
+            pool.submit(pipeline.process_query, query): (i, query)
+            for i, query in enumerate(demo_queries, 1)
+        }
         
-        result = pipeline.process_query(query)
-        
-        print(f"\n🤖 Answer:\n{result['answer']}")
-        print(f"\n📊 Found {result['result_count']} results in {result['metadata']['processing_time_seconds']}s")
+        for future in as_completed(futures):
+            i, query = futures[future]
+            result = future.result()
+            
+            out = StringIO()
+            print(f"\n\n{'='*60}", file=out)
+            print(f"Demo Query {i}/{len(demo_queries)}: {query}", file=out)
+            print('='*60, file=out)
+            
+            print(f"\n🤖 Answer:\n{result['answer']}", file=out)
+            cached_tag = " (cached)" if result['metadata'].get('cached') else ""
+            print(f"\n📊 Found {result['result_count']} results in {result['metadata']['processing_time_seconds']}s{cached_tag}", file=out)
+            _write_stdout(out)
 
 
 def main():
     """Main application entry point"""
+    Config.ensure_valid()
     setup_logging()
     
     print("\n" + "="*60)
@@ -150,6 +181,7 @@ def main():
     # Create pipeline
     logger.info("\n🚀 Starting GraphRAG Pipeline...")
     pipeline = GraphRAGPipeline()
+    pipeline.warm_up()
     
     try:
         # Choose mode
@@ -2,10 +2,15 @@
 Answer Generator - Generate natural language answers from Cypher results
 """
 
+import hashlib
 import json
-from typing import Dict, List, Optional, Any
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 from loguru import logger
-from groq import Groq
+
+if TYPE_CHECKING:
+    from groq import Groq
 
 from config import Config
 from prompt_templates import (
@@ -19,36 +24,35 @@ from prompt_templates import (
 )
 
 class AnswerGenerator:
-    def __init__(self):
-        self.client = Groq(api_key=Config.GROQ_API_KEY)
+    COMPLETION_CACHE_SIZE = 512
+    ANSWER_ERROR = "Error generating answer. Please try again."
+    
+    def __init__(self, client: Optional["Groq"] = None):
+        if client is None:
+            from groq import Groq
+            client = Groq(api_key=Config.GROQ_API_KEY)
+        self.client = client
         self.model = Config.GROQ_MODEL
         self.max_tokens = Config.LLM_MAX_TOKENS
         self.temperature = Config.LLM_TEMPERATURE
+        self._encoder = json.JSONEncoder(indent=2, default=str)
+        self._completion_cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
     
     def extract_context(self, query: str, results: List[Dict]) -> str:
         """Extract relevant context from query results"""
         if not results:
             return "No data found in the knowledge graph."
         
-        results_text = json.dumps(results, indent=2, default=str)
-        
         prompt = CONTEXT_EXTRACTION_PROMPT.format(
             query=query,
-            results=results_text[:3000]
+            results=self._serialize_capped(results, 3000)
         )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a data analyst."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=1000
-            )
-            
-            return response.choices[0].message.content
+            return self._complete("You are a data analyst.", prompt, 0.1, 1000)
         except Exception as e:
             logger.error(f"Error extracting context: {e}")
             return "Error extracting context"
@@ -58,38 +62,136 @@ class AnswerGenerator:
         query: str, 
         results: List[Dict],
         context: Dict[str, Any],
-        understanding: Dict
+        understanding: Dict,
+        on_token: Optional[Callable[[str], None]] = None
     ) -> str:
-        """Generate comprehensive answer from query results"""
+        """
+        Generate comprehensive answer from query results
+        
+        If on_token is given, the completion is streamed and on_token is called
+        with each text chunk as it arrives; the full answer is still returned.
+        """
+        if not results:
+            return "No matching warehouses were found in the knowledge graph. Try broadening your query."
+        
         logger.info("Generating answer...")
         
-        context_summary = self.extract_context(query, results)
         results_summary = self._format_results_summary(results, understanding)
         
         prompt = ANSWER_GENERATION_PROMPT.format(
             query=query,
-            context=json.dumps(context, indent=2, default=str)[:2000],
+            context=self._serialize_capped(context, 2000),
             results_summary=results_summary
         )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a warehouse risk assessment analyst."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
+            answer = self._complete(
+                "You are a warehouse risk assessment analyst.",
+                prompt,
+                self.temperature,
+                self.max_tokens,
+                on_token
             )
             
-            answer = response.choices[0].message.content
             logger.info("Answer generated successfully")
             return answer
             
         except Exception as e:
             logger.error(f"Error generating answer: {e}")
-            return "Error generating answer. Please try again."
+            return self.ANSWER_ERROR
+    
+    def _complete(
+        self,
+        system: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """
+        Run a chat completion, reusing the answer for a previously seen request
+        
+        Args:
+            system: System message content
+            prompt: User message content
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            on_token: Optional callback; streams the completion (a cached answer
+                is delivered as a single chunk)
+        """
+        key = hashlib.blake2b(
+            "\0".join([self.model, system, prompt, str(temperature), str(max_tokens)]).encode(),
+            digest_size=16
+        ).digest()
+        
+        with self._cache_lock:
+            cached = self._completion_cache.get(key)
+            if cached is not None:
+                self._completion_cache.move_to_end(key)
+                self._cache_hits += 1
+            else:
+                self._cache_misses += 1
+        if cached is not None:
+            if on_token is not None:
+                on_token(cached)
+            return cached
+        
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ]
+        
+        if on_token is None:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            content = response.choices[0].message.content
+        else:
+            content = self._stream_completion(messages, temperature, max_tokens, on_token)
+        
+        with self._cache_lock:
+            self._completion_cache[key] = content
+            if len(self._completion_cache) > self.COMPLETION_CACHE_SIZE:
+                self._completion_cache.popitem(last=False)
+        
+        return content
+    
+    def cache_info(self) -> Dict[str, int]:
+        """Completion cache counters: hits, misses and current size"""
+        with self._cache_lock:
+            return {
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "size": len(self._completion_cache)
+            }
+    
+    def _stream_completion(
+        self,
+        messages: List[Dict],
+        temperature: float,
+        max_tokens: int,
+        on_token: Callable[[str], None]
+    ) -> str:
+        """Stream a completion, forwarding each chunk to on_token"""
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        
+        parts = []
+        for chunk in stream:
+            token = chunk.choices[0].delta.content
+            if token:
+                parts.append(token)
+                on_token(token)
+        
+        return "".join(parts)
     
     def generate_risk_assessment(
         self, 
@@ -108,17 +210,7 @@ class AnswerGenerator:
         )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a risk assessment expert."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=1500
-            )
-            
-            return response.choices[0].message.content
+            return self._complete("You are a risk assessment expert.", prompt, 0.2, 1500)
         except Exception as e:
             logger.error(f"Error generating risk assessment: {e}")
             return "Error generating risk assessment"
@@ -132,6 +224,8 @@ class AnswerGenerator:
         logger.info("Generating recommendations...")
         
         issues = self._identify_issues(warehouse_data)
+        if not issues:
+            return "No issues identified for this warehouse. Continue routine monitoring."
         
         prompt = RECOMMENDATION_PROMPT.format(
             current_state=json.dumps(warehouse_data, indent=2, default=str),
@@ -140,17 +234,7 @@ class AnswerGenerator:
         )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a business consultant."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=1500
-            )
-            
-            return response.choices[0].message.content
+            return self._complete("You are a business consultant.", prompt, 0.3, 1500)
         except Exception as e:
             logger.error(f"Error generating recommendations: {e}")
             return "Error generating recommendations"
@@ -169,21 +253,23 @@ class AnswerGenerator:
         )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a comparative analyst."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=2000
-            )
-            
-            return response.choices[0].message.content
+            return self._complete("You are a comparative analyst.", prompt, 0.2, 2000)
         except Exception as e:
             logger.error(f"Error generating comparison: {e}")
             return "Error generating comparison"
     
+    def _serialize_capped(self, obj: Any, cap: int) -> str:
+        """JSON-encode obj, stopping once cap characters have been produced"""
+        parts = []
+        size = 0
+        for chunk in self._encoder.iterencode(obj):
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= cap:
+                break
+        
+        return "".join(parts)[:cap]
+    
     def _format_results_summary(
         self, 
         results: List[Dict],
@@ -273,6 +359,8 @@ class AnswerGenerator:
 
 
 if __name__ == "__main__":
+    Config.ensure_valid()
+    
     generator = AnswerGenerator()
     
     test_query = "Show me high-risk warehouses"
@@ -2,6 +2,7 @@
 Configuration Manager - Load settings from .env
 """
 
+import functools
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -31,11 +32,18 @@ class Config:
     EMBEDDINGS_MODEL = os.getenv('EMBEDDINGS_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
     EMBEDDINGS_DIMENSION = int(os.getenv('EMBEDDINGS_DIMENSION', 384))
     EMBEDDINGS_BATCH_SIZE = int(os.getenv('EMBEDDINGS_BATCH_SIZE', 32))
+    ENABLE_SEMANTIC_CACHE = os.getenv('ENABLE_SEMANTIC_CACHE', 'false').lower() == 'true'
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.92))
     
     # Query Configuration
     MAX_RESULTS = int(os.getenv('MAX_RESULTS', 10))
     CONTEXT_WINDOW = int(os.getenv('CONTEXT_WINDOW', 5))
     ENABLE_MULTI_HOP = os.getenv('ENABLE_MULTI_HOP', 'true').lower() == 'true'
+    BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 4))
+    QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', 128))
+    QUERY_CACHE_TTL = int(os.getenv('QUERY_CACHE_TTL', 600))
+    PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 64))
+    PROFILE_CACHE_TTL = int(os.getenv('PROFILE_CACHE_TTL', 300))
     
     # LLM Configuration
     LLM_TEMPERATURE = float(os.getenv('LLM_TEMPERATURE', 0.1))
@@ -46,8 +54,9 @@ class Config:
     LOG_FILE = os.getenv('LOG_FILE', 'logs/graphrag.log')
     
     @classmethod
+    @functools.lru_cache(maxsize=1)
     def validate(cls):
-        """Validate required configuration"""
+        """Validate required configuration (runs once per process once it passes)"""
         errors = []
         
         if not cls.GROQ_API_KEY:
@@ -64,6 +73,15 @@ class Config:
         
         logger.info("✅ Configuration validated successfully")
     
+    @classmethod
+    def ensure_valid(cls):
+        """Validate configuration from an entry point, logging the failure before raising"""
+        try:
+            cls.validate()
+        except ValueError as e:
+            logger.error(f"Configuration validation failed: {e}")
+            raise
+    
     @classmethod
     def print_config(cls):
         """Print current configuration (hiding sensitive data)"""
@@ -77,10 +95,3 @@ class Config:
         print(f"Max Results: {cls.MAX_RESULTS}")
         print(f"Temperature: {cls.LLM_TEMPERATURE}")
         print("="*60 + "\n")
-
-# Validate configuration on import
-try:
-    Config.validate()
-except ValueError as e:
-    logger.error(f"Configuration validation failed: {e}")
-    raise
\ No newline at end of file
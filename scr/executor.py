@@ -2,44 +2,108 @@
 Query Executor - Execute Cypher queries and process results
 """
 
+import functools
 from neo4j import GraphDatabase
-from typing import List, Dict, Any, Optional
+from neo4j.exceptions import CypherSyntaxError
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 from loguru import logger
-import pandas as pd
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 from config import Config
 
 class QueryExecutor:
+    # Context lookup for execute_with_context; kept as one fixed string so
+    # Neo4j's query cache plans it once and reuses the plan for every ID list
+    CONTEXT_QUERY = """
+    MATCH (w:Warehouse)
+    WHERE w.warehouse_id IN $warehouse_ids
+    OPTIONAL MATCH (w)-[:LOCATED_IN]->(rz:RegionalZone)-[:PART_OF]->(z:Zone)
+    OPTIONAL MATCH (w)-[:OPERATES_IN]->(m:MarketContext)
+    WITH collect({
+             warehouse_id: w.warehouse_id,
+             region: rz.regional_zone_name,
+             zone: z.zone_name,
+             competitors: m.competitor_count,
+             retail_shops: m.retail_shop_count
+         }) as related_entities,
+         collect(DISTINCT w) as warehouses
+    CALL {
+        WITH warehouses
+        UNWIND warehouses AS w
+        MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+        WITH r.event_type as event_type, SUM(r.occurrence_count) as total
+        ORDER BY total DESC
+        RETURN collect({event_type: event_type, total: total}) as risk_totals
+    }
+    RETURN related_entities, risk_totals
+    """
+    
     def __init__(self):
         self.driver = GraphDatabase.driver(
             Config.NEO4J_URI,
             auth=(Config.NEO4J_USERNAME, Config.NEO4J_PASSWORD)
         )
         self.database = Config.NEO4J_DATABASE
+        self._explain_cached = functools.lru_cache(maxsize=1024)(self._explain)
     
     def close(self):
         self.driver.close()
     
+    def warm_up(self):
+        """Open a connection and plan the context query so the first real query skips both"""
+        self.execute_query(self.CONTEXT_QUERY, {"warehouse_ids": []})
+    
     def execute_query(
         self, 
         cypher_query: str, 
         parameters: Optional[Dict] = None
     ) -> List[Dict[str, Any]]:
         """Execute Cypher query and return results"""
+        try:
+            return self._run(cypher_query, parameters)
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            logger.error(f"Query: {cypher_query}")
+            return []
+    
+    def _run(
+        self,
+        cypher_query: str,
+        parameters: Optional[Dict] = None
+    ) -> List[Dict[str, Any]]:
+        """Execute Cypher query and return results, raising on failure"""
+        logger.info("Executing query...")
+        
+        with self.driver.session(database=self.database) as session:
+            result = session.run(cypher_query, parameters or {})
+            records = [dict(record) for record in result]
+        
+        logger.info("Query returned {} results", len(records))
+        return records
+    
+    def execute_query_df(
+        self, 
+        cypher_query: str, 
+        parameters: Optional[Dict] = None
+    ) -> "pd.DataFrame":
+        """Execute Cypher query straight into a DataFrame, without per-record dicts"""
+        import pandas as pd
+        
         logger.info("Executing query...")
         
         try:
             with self.driver.session(database=self.database) as session:
-                result = session.run(cypher_query, parameters or {})
-                records = [dict(record) for record in result]
+                df = session.run(cypher_query, parameters or {}).to_df()
                 
-                logger.info(f"Query returned {len(records)} results")
-                return records
+                logger.info("Query returned {} results", len(df))
+                return df
                 
         except Exception as e:
             logger.error(f"Query execution failed: {e}")
             logger.error(f"Query: {cypher_query}")
-            return []
+            return pd.DataFrame()
     
     def execute_with_context(
         self, 
@@ -47,8 +111,22 @@ class QueryExecutor:
         parameters: Optional[Dict] = None,
         max_hops: int = 3
     ) -> Dict[str, Any]:
-        """Execute query and gather contextual information"""
-        primary_results = self.execute_query(cypher_query, parameters)
+        """Execute query and gather contextual information
+        
+        A failed query or context lookup is reported under "error", so callers
+        can tell it apart from a query that genuinely matched nothing.
+        """
+        try:
+            primary_results = self._run(cypher_query, parameters)
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            logger.error(f"Query: {cypher_query}")
+            return {
+                "results": [],
+                "context": {},
+                "summary": "Query failed",
+                "error": str(e)
+            }
         
         if not primary_results:
             return {
@@ -65,53 +143,34 @@ class QueryExecutor:
         
         # Gather additional context
         context = {}
+        error = None
         if warehouse_ids:
-            context['related_entities'] = self._get_related_entities(warehouse_ids[:5])
-            context['risk_summary'] = self._get_risk_summary(warehouse_ids[:5])
+            try:
+                context = self._get_context(warehouse_ids[:5])
+            except Exception as e:
+                logger.error(f"Context lookup failed: {e}")
+                error = str(e)
         
-        return {
+        response = {
             "results": primary_results,
             "context": context,
             "summary": self._generate_results_summary(primary_results)
         }
+        if error:
+            response["error"] = error
+        return response
     
-    def _get_related_entities(self, warehouse_ids: List[str]) -> Dict:
-        """Get related entities for context"""
-        query = """
-        MATCH (w:Warehouse)
-        WHERE w.warehouse_id IN $warehouse_ids
-        OPTIONAL MATCH (w)-[:LOCATED_IN]->(rz:RegionalZone)-[:PART_OF]->(z:Zone)
-        OPTIONAL MATCH (w)-[:OPERATES_IN]->(m:MarketContext)
-        RETURN w.warehouse_id as warehouse_id,
-               rz.regional_zone_name as region,
-               z.zone_name as zone,
-               m.competitor_count as competitors,
-               m.retail_shop_count as retail_shops
-        """
-        
-        return self.execute_query(query, {"warehouse_ids": warehouse_ids})
-    
-    def _get_risk_summary(self, warehouse_ids: List[str]) -> Dict:
-        """Get risk event summary"""
-        query = """
-        MATCH (w:Warehouse)-[:EXPERIENCED]->(r:RiskEvent)
-        WHERE w.warehouse_id IN $warehouse_ids
-        RETURN w.warehouse_id as warehouse_id,
-               r.event_type as event_type,
-               SUM(r.occurrence_count) as total_occurrences
-        ORDER BY total_occurrences DESC
-        """
-        
-        results = self.execute_query(query, {"warehouse_ids": warehouse_ids})
-        
-        summary = {}
-        for record in results:
-            event_type = record['event_type']
-            if event_type not in summary:
-                summary[event_type] = 0
-            summary[event_type] += record['total_occurrences']
+    def _get_context(self, warehouse_ids: List[str]) -> Dict:
+        """Get related entities and a risk event summary in one round trip, raising on failure"""
+        results = self._run(self.CONTEXT_QUERY, {"warehouse_ids": warehouse_ids})
+        if not results:
+            return {}
         
-        return summary
+        record = results[0]
+        return {
+            'related_entities': record['related_entities'],
+            'risk_summary': {risk['event_type']: risk['total'] for risk in record['risk_totals']}
+        }
     
     def _generate_results_summary(self, results: List[Dict]) -> str:
         """Generate human-readable summary"""
@@ -131,24 +190,41 @@ class QueryExecutor:
         else:
             return f"Query returned {count} results"
     
-    def results_to_dataframe(self, results: List[Dict]) -> pd.DataFrame:
-        """Convert results to pandas DataFrame"""
+    def results_to_dataframe(self, results: List[Dict]) -> "pd.DataFrame":
+        """Convert already-fetched results to pandas DataFrame (use execute_query_df to query directly)"""
+        import pandas as pd
+        
         if not results:
             return pd.DataFrame()
         
         return pd.DataFrame(results)
     
     def validate_query(self, cypher_query: str) -> bool:
-        """Validate Cypher query syntax"""
+        """Validate Cypher query syntax (verdicts are cached per query string)"""
+        hits = self._explain_cached.cache_info().hits
+        try:
+            valid = self._explain_cached(cypher_query)
+        except Exception as e:
+            logger.error(f"Query validation failed: {e}")
+            return False
+        
+        if self._explain_cached.cache_info().hits > hits:
+            logger.debug("Query validation served from cache")
+        return valid
+    
+    def _explain(self, cypher_query: str) -> bool:
+        """EXPLAIN a query on the server; connection errors raise and are not cached"""
         try:
             with self.driver.session(database=self.database) as session:
-                session.run("EXPLAIN " + cypher_query)
+                session.run("EXPLAIN " + cypher_query).consume()
             return True
-        except Exception as e:
+        except CypherSyntaxError as e:
             logger.error(f"Query validation failed: {e}")
             return False
 
 if __name__ == "__main__":
+    Config.ensure_valid()
+    
     executor = QueryExecutor()
     
     cypher = """
@@ -2,24 +2,65 @@
 Graph Builder - Construct Neo4j graph from extracted entities
 """
 
+from contextlib import contextmanager
 from neo4j import GraphDatabase
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
 from loguru import logger
-from tqdm import tqdm
 
 from config import Config
 
 class GraphBuilder:
-    def __init__(self):
+    def __init__(self, batch_size: int = 5000):
         self.driver = GraphDatabase.driver(
             Config.NEO4J_URI,
             auth=(Config.NEO4J_USERNAME, Config.NEO4J_PASSWORD)
         )
         self.database = Config.NEO4J_DATABASE if Config.NEO4J_DATABASE != 'warehouse_risk' else None
+        self.batch_size = batch_size
+        self._progress_callback = None
+        self._batches_done = 0
+        self._batches_total = 0
+        self._session = None
         
     def close(self):
         self.driver.close()
     
+    def _num_batches(self, rows: List[Dict]) -> int:
+        """Number of UNWIND batches needed for rows"""
+        return max(1, -(-len(rows) // self.batch_size))
+    
+    def _report_batch(self):
+        """Advance build progress by one batch"""
+        self._batches_done += 1
+        if self._progress_callback:
+            self._progress_callback(self._batches_done, self._batches_total)
+    
+    @staticmethod
+    def _write_batch(tx, query: str, params: Dict):
+        """Transaction function for one UNWIND batch"""
+        tx.run(query, params).consume()
+    
+    @contextmanager
+    def _session_scope(self):
+        """The build's shared session when one is open, else a new session"""
+        if self._session is not None:
+            yield self._session
+        else:
+            with self.driver.session(database=self.database) as session:
+                yield session
+    
+    def _run_batched(self, query: str, param: str, rows: List[Dict]):
+        """Run an UNWIND query over rows in batch_size slices, one managed write transaction each"""
+        with self._session_scope() as session:
+            for start in range(0, len(rows), self.batch_size):
+                session.execute_write(
+                    self._write_batch, query, {param: rows[start:start + self.batch_size]}
+                )
+                self._report_batch()
+        
+        if not rows:
+            self._report_batch()
+    
     def clear_database(self):
         """Clear existing graph data"""
         logger.warning("Clearing database...")
@@ -36,6 +77,10 @@ class GraphBuilder:
             "CREATE CONSTRAINT manager_id IF NOT EXISTS FOR (m:Manager) REQUIRE m.manager_id IS UNIQUE",
             "CREATE CONSTRAINT zone_id IF NOT EXISTS FOR (z:Zone) REQUIRE z.zone_id IS UNIQUE",
             "CREATE CONSTRAINT regional_zone_id IF NOT EXISTS FOR (rz:RegionalZone) REQUIRE rz.regional_zone_id IS UNIQUE",
+            # Properties the analytics queries filter and sort on
+            "CREATE INDEX warehouse_location IF NOT EXISTS FOR (w:Warehouse) ON (w.location_type)",
+            "CREATE INDEX warehouse_risk_score IF NOT EXISTS FOR (w:Warehouse) ON (w.risk_score)",
+            "CREATE INDEX risk_event_type IF NOT EXISTS FOR (r:RiskEvent) ON (r.event_type)",
         ]
         
         with self.driver.session(database=self.database) as session:
@@ -66,8 +111,7 @@ class GraphBuilder:
         })
         """
         
-        with self.driver.session(database=self.database) as session:
-            session.run(query, warehouses=warehouses)
+        self._run_batched(query, 'warehouses', warehouses)
         
         logger.info("✅ Warehouse nodes created")
     
@@ -83,8 +127,7 @@ class GraphBuilder:
         CREATE (m)-[:MANAGES]->(w)
         """
         
-        with self.driver.session(database=self.database) as session:
-            session.run(query, managers=managers)
+        self._run_batched(query, 'managers', managers)
         
         logger.info("✅ Manager nodes and relationships created")
     
@@ -110,9 +153,8 @@ class GraphBuilder:
         MERGE (w)-[:LOCATED_IN]->(region)
         """
         
-        with self.driver.session(database=self.database) as session:
-            session.run(zone_query, zones=zones)
-            session.run(regional_query, regional_zones=regional_zones)
+        self._run_batched(zone_query, 'zones', zones)
+        self._run_batched(regional_query, 'regional_zones', regional_zones)
         
         logger.info("✅ Zone hierarchy created")
     
@@ -120,29 +162,21 @@ class GraphBuilder:
         """Create Infrastructure nodes"""
         logger.info(f"Creating {len(infrastructures)} infrastructure nodes...")
         
-        with self.driver.session(database=self.database) as session:
-            for inf in infrastructures:
-                query = """
-                CREATE (i:Infrastructure {
-                    infrastructure_id: $inf_id,
-                    has_temp_regulation: $temp_reg,
-                    has_electric_backup: $electric_backup,
-                    is_flood_proof: $flood_proof,
-                    certificate_type: $cert_type
-                })
-                WITH i
-                MATCH (w:Warehouse {warehouse_id: $warehouse_id})
-                CREATE (w)-[:HAS_INFRASTRUCTURE]->(i)
-                """
-                
-                session.run(query, {
-                    'inf_id': str(inf['infrastructure_id']),
-                    'temp_reg': bool(inf['has_temp_regulation']),
-                    'electric_backup': bool(inf['has_electric_backup']),
-                    'flood_proof': bool(inf['is_flood_proof']),
-                    'cert_type': str(inf['certificate_type']),
-                    'warehouse_id': str(inf['warehouse_id'])
-                })
+        query = """
+        UNWIND $infrastructures AS inf
+        CREATE (i:Infrastructure {
+            infrastructure_id: inf.infrastructure_id,
+            has_temp_regulation: inf.has_temp_regulation,
+            has_electric_backup: inf.has_electric_backup,
+            is_flood_proof: inf.is_flood_proof,
+            certificate_type: inf.certificate_type
+        })
+        WITH i, inf
+        MATCH (w:Warehouse {warehouse_id: inf.warehouse_id})
+        CREATE (w)-[:HAS_INFRASTRUCTURE]->(i)
+        """
+        
+        self._run_batched(query, 'infrastructures', infrastructures)
         
         logger.info("✅ Infrastructure nodes created")
     
@@ -167,8 +201,7 @@ class GraphBuilder:
         }]->(r)
         """
         
-        with self.driver.session(database=self.database) as session:
-            session.run(query, risk_events=risk_events)
+        self._run_batched(query, 'risk_events', risk_events)
         
         logger.info("✅ Risk event nodes created")
     
@@ -190,8 +223,7 @@ class GraphBuilder:
         CREATE (w)-[:OPERATES_IN]->(m)
         """
         
-        with self.driver.session(database=self.database) as session:
-            session.run(query, market_contexts=market_contexts)
+        self._run_batched(query, 'market_contexts', market_contexts)
         
         logger.info("✅ Market context nodes created")
     
@@ -212,29 +244,62 @@ class GraphBuilder:
         CREATE (w)-[:SUBJECT_TO]->(c)
         """
         
-        with self.driver.session(database=self.database) as session:
-            session.run(query, compliances=compliances)
+        self._run_batched(query, 'compliances', compliances)
         
         logger.info("✅ Compliance nodes created")
     
-    def build_graph(self, entities: Dict[str, List[Dict]], clear_existing: bool = True):
-        """Build complete graph from entities"""
-        logger.info("🏗️  Starting graph construction...")
-        
+    def prepare_database(self, clear_existing: bool = True):
+        """Clear the graph and create constraints; needs no entity data"""
         if clear_existing:
             self.clear_database()
         
         self.create_constraints()
-        self.create_warehouse_nodes(entities['warehouses'])
-        self.create_manager_nodes(entities['managers'])
-        self.create_zone_hierarchy(entities['zones'], entities['regional_zones'])
-        self.create_infrastructure_nodes(entities['infrastructures'])
-        self.create_risk_event_nodes(entities['risk_events'])
-        self.create_market_context_nodes(entities['market_contexts'])
-        self.create_compliance_nodes(entities['compliances'])
-        
-        # Verify graph
+    
+    def build_graph(
+        self,
+        entities: Dict[str, List[Dict]],
+        clear_existing: bool = True,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        prepared: bool = False
+    ):
+        """
+        Build complete graph from entities
+        
+        Args:
+            entities: Entity lists keyed by node type, from DataIngestion
+            clear_existing: Delete all nodes before building
+            progress_callback: Called as (batches_done, batches_total) after each batch
+            prepared: prepare_database() was already run for this build
+        """
+        logger.info("🏗️  Starting graph construction...")
+        
+        self._progress_callback = progress_callback
+        self._batches_done = 0
+        self._batches_total = sum(
+            self._num_batches(entities[key])
+            for key in ('warehouses', 'managers', 'zones', 'regional_zones',
+                        'infrastructures', 'risk_events', 'market_contexts', 'compliances')
+        )
+        
+        if not prepared:
+            self.prepare_database(clear_existing)
+        
+        # One session (and pooled connection) for every pass; the warehouse
+        # constraint created above backs each pass's Warehouse lookups
         with self.driver.session(database=self.database) as session:
+            self._session = session
+            try:
+                self.create_warehouse_nodes(entities['warehouses'])
+                self.create_manager_nodes(entities['managers'])
+                self.create_zone_hierarchy(entities['zones'], entities['regional_zones'])
+                self.create_infrastructure_nodes(entities['infrastructures'])
+                self.create_risk_event_nodes(entities['risk_events'])
+                self.create_market_context_nodes(entities['market_contexts'])
+                self.create_compliance_nodes(entities['compliances'])
+            finally:
+                self._session = None
+            
+            # Verify graph
             result = session.run("""
                 MATCH (n)
                 RETURN labels(n)[0] as label, count(n) as count
@@ -250,6 +315,8 @@ class GraphBuilder:
 if __name__ == "__main__":
     from ingestion import DataIngestion
     
+    Config.ensure_valid()
+    
     ingestion = DataIngestion()
     df, entities = ingestion.run_pipeline()
     
@@ -2,6 +2,8 @@
 Data Ingestion Pipeline - Load CSV and prepare for graph construction
 """
 
+import importlib.util
+import sys
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple
@@ -10,16 +12,40 @@ from pathlib import Path
 
 from config import Config
 
+# Identifier and label columns, read as text rather than inferred
+TEXT_DTYPES = {
+    'Ware_house_ID': str,
+    'WH_Manager_ID': str,
+    'Location_type': str,
+    'WH_capacity_size': str,
+    'zone': str,
+    'WH_regional_zone': str,
+    'wh_owner_type': str,
+    'approved_wh_govt_certificate': str
+}
+
+# pyarrow parses the CSV multithreaded; without it pandas' C parser is used
+CSV_ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') else 'c'
+
 class DataIngestion:
     def __init__(self):
         self.csv_path = Config.DATA_INPUT_CSV
         self.processed_dir = Config.DATA_PROCESSED_DIR
         self.df = None
         
-    def load_data(self) -> pd.DataFrame:
+    def load_data(self, engine: str = CSV_ENGINE) -> pd.DataFrame:
         """Load warehouse dataset from CSV"""
         logger.info(f"Loading data from {self.csv_path}")
-        self.df = pd.read_csv(self.csv_path)
+        if engine == 'pyarrow':
+            # The pyarrow reader applies dtype hints with astype(str), turning blank
+            # cells into 'None'/'nan'; cast only the values that are present instead
+            self.df = pd.read_csv(self.csv_path, engine='pyarrow')
+            for name in TEXT_DTYPES:
+                if name in self.df.columns:
+                    values = self.df[name]
+                    self.df[name] = values.where(values.isna(), values.astype(str))
+        else:
+            self.df = pd.read_csv(self.csv_path, engine=engine, dtype=TEXT_DTYPES)
         logger.info(f"Loaded {len(self.df)} warehouse records")
         return self.df
     
@@ -35,7 +61,9 @@ class DataIngestion:
             'approved_wh_govt_certificate': 'None',
             'wh_breakdown_l3m': 0,
             'storage_issue_reported_l3m': 0,
-            'transport_issue_l1y': 0
+            'transport_issue_l1y': 0,
+            'wh_est_year': 2000,
+            'workers_num': 0
         })
         
         # Convert boolean fields
@@ -46,7 +74,7 @@ class DataIngestion:
         
         # Create unique IDs
         if 'Ware_house_ID' not in self.df.columns:
-            self.df['Ware_house_ID'] = [f"WH_{i:04d}" for i in range(len(self.df))]
+            self.df['Ware_house_ID'] = 'WH_' + pd.Series(np.arange(len(self.df)), index=self.df.index).astype(str).str.zfill(4)
         
         logger.info("Data cleaning completed")
         return self.df
@@ -55,27 +83,24 @@ class DataIngestion:
         """Calculate composite risk scores"""
         logger.info("Calculating risk scores...")
         
-        # Risk Score Components
-        breakdown_risk = self.df.get('wh_breakdown_l3m', 0) / 10.0
-        storage_risk = self.df.get('storage_issue_reported_l3m', 0) / 5.0
-        transport_risk = self.df.get('transport_issue_l1y', 0).astype(float)
+        risk_columns = [
+            'wh_breakdown_l3m', 'storage_issue_reported_l3m', 'transport_issue_l1y',
+            'temp_reg_mach', 'electric_supply', 'flood_proof', 'flood_impacted'
+        ]
+        # Columns the CSV lacks count as 0, as in _column
+        arr = self.df.reindex(columns=risk_columns, fill_value=0).to_numpy(dtype=np.float64)
         
         # Infrastructure protection factor
-        protection_factor = (
-            self.df.get('temp_reg_mach', 0).astype(float) * 0.3 +
-            self.df.get('electric_supply', 0).astype(float) * 0.3 +
-            self.df.get('flood_proof', 0).astype(float) * 0.4
-        )
+        protection_factor = arr[:, 3] * 0.3 + arr[:, 4] * 0.3 + arr[:, 5] * 0.4
         
-        # Environmental risk factor
-        env_risk = self.df.get('flood_impacted', 0).astype(float) * 0.5
+        # Weighted incident and environmental risk, with the component
+        # scaling folded into the weights:
+        #   breakdown/10 * 0.4, storage/5 * 0.3, transport * 0.2, flood * 0.5 * 0.1
+        raw_risk = arr[:, 0] * 0.04 + arr[:, 1] * 0.06 + arr[:, 2] * 0.2 + arr[:, 6] * 0.05
         
         # Composite risk score (0-1 scale)
-        self.df['risk_score'] = np.clip(
-            (breakdown_risk * 0.4 + storage_risk * 0.3 + transport_risk * 0.2 + env_risk * 0.1) * 
-            (1 - protection_factor * 0.3),
-            0, 1
-        )
+        raw_risk *= 1 - protection_factor * 0.3
+        self.df['risk_score'] = np.clip(raw_risk, 0, 1, out=raw_risk)
         
         logger.info(f"Risk scores calculated. Mean: {self.df['risk_score'].mean():.3f}")
         return self.df
@@ -84,122 +109,149 @@ class DataIngestion:
         """Extract entities for each node type"""
         logger.info("Extracting entities...")
         
-        entities = {
-            'warehouses': [],
-            'managers': [],
-            'zones': [],
-            'regional_zones': [],
-            'infrastructures': [],
-            'risk_events': [],
-            'market_contexts': [],
-            'compliances': []
-        }
-        
-        for idx, row in self.df.iterrows():
-            wh_id = row['Ware_house_ID']
-            
-            # Warehouse Entity
-            entities['warehouses'].append({
-                'warehouse_id': wh_id,
-                'capacity_size': row.get('WH_capacity_size', 'Unknown'),
-                'established_year': int(float(row.get('wh_est_year', 2000))) if pd.notna(row.get('wh_est_year')) else 2000,
-                'owner_type': row.get('wh_owner_type', 'Unknown'),
-                'location_type': row.get('Location_type', 'Unknown'),
-                'distance_from_hub': float(row.get('dist_from_hub', 0)),
-                'workers_count': int(float(row.get('workers_num', 0))) if pd.notna(row.get('workers_num')) else 0,
-                'product_shipped_tons': float(row.get('product_wg_ton', 0)),
-                'risk_score': float(row.get('risk_score', 0))
-            })
-            
-            # Manager Entity
-            if pd.notna(row.get('WH_Manager_ID')):
-                entities['managers'].append({
-                    'manager_id': row['WH_Manager_ID'],
-                    'warehouse_id': wh_id
-                })
-            
-            # Zone Entities
-            if pd.notna(row.get('zone')):
-                entities['zones'].append({
-                    'zone_id': f"ZONE_{row['zone']}",
-                    'zone_name': row['zone']
-                })
-            
-            if pd.notna(row.get('WH_regional_zone')):
-                entities['regional_zones'].append({
-                    'regional_zone_id': f"RZ_{row['WH_regional_zone']}",
-                    'regional_zone_name': row['WH_regional_zone'],
-                    'parent_zone': row.get('zone', 'Unknown'),
-                    'warehouse_id': wh_id
-                })
-            
-            # Infrastructure Entity
-            entities['infrastructures'].append({
-                'infrastructure_id': str(f"INF_{wh_id}"),
-                'warehouse_id': str(wh_id),
-                'has_temp_regulation': bool(int(row.get('temp_reg_mach', 0))),
-                'has_electric_backup': bool(int(row.get('electric_supply', 0))),
-                'is_flood_proof': bool(int(row.get('flood_proof', 0))),
-                'certificate_type': str(row.get('approved_wh_govt_certificate', 'None'))
-            })
-            
-            # Risk Events
-            if row.get('wh_breakdown_l3m', 0) > 0:
-                entities['risk_events'].append({
-                    'event_id': f"RISK_BREAKDOWN_{wh_id}",
-                    'warehouse_id': wh_id,
-                    'event_type': 'breakdown',
-                    'occurrence_count': int(row['wh_breakdown_l3m']),
-                    'severity': 'high' if row['wh_breakdown_l3m'] > 2 else 'medium',
-                    'time_period': 'l3m'
-                })
-            
-            if row.get('storage_issue_reported_l3m', 0) > 0:
-                entities['risk_events'].append({
-                    'event_id': f"RISK_STORAGE_{wh_id}",
-                    'warehouse_id': wh_id,
-                    'event_type': 'storage_issue',
-                    'occurrence_count': int(row['storage_issue_reported_l3m']),
-                    'severity': 'medium',
-                    'time_period': 'l3m'
-                })
-            
-            if row.get('transport_issue_l1y', 0) > 0:
-                entities['risk_events'].append({
-                    'event_id': f"RISK_TRANSPORT_{wh_id}",
-                    'warehouse_id': wh_id,
-                    'event_type': 'transport_issue',
-                    'occurrence_count': 1,
-                    'severity': 'high',
-                    'time_period': 'l1y'
-                })
-            
-            # Market Context
-            entities['market_contexts'].append({
-                'market_id': f"MKT_{wh_id}",
-                'warehouse_id': wh_id,
-                'competitor_count': int(row.get('Competitor_in_mkt', 0)),
-                'retail_shop_count': int(row.get('retail_shop_num', 0)),
-                'distributor_count': int(row.get('distributor_num', 0)),
-                'is_flood_impacted': bool(row.get('flood_impacted', 0))
-            })
-            
-            # Compliance
-            entities['compliances'].append({
-                'compliance_id': f"COMP_{wh_id}",
-                'warehouse_id': wh_id,
-                'govt_checks_l3m': int(row.get('govt_check_l3m', 0)),
-                'certificate_type': row.get('approved_wh_govt_certificate', 'None'),
-                'refill_requests_l3m': int(row.get('num_refill_req_l3m', 0))
-            })
-        
-        # Deduplicate
-        entities['managers'] = list({m['manager_id']: m for m in entities['managers']}.values())
-        entities['zones'] = list({z['zone_id']: z for z in entities['zones']}.values())
+        df = self.df
+        col = self._column
+        wh_id = df['Ware_house_ID']
+        wh_str = wh_id.astype(str)
+        
+        entities = {}
+        
+        # Warehouse Entity
+        entities['warehouses'] = pd.DataFrame({
+            'warehouse_id': wh_id,
+            'capacity_size': col('WH_capacity_size', 'Unknown'),
+            'established_year': col('wh_est_year', 2000).astype(int),
+            'owner_type': col('wh_owner_type', 'Unknown'),
+            'location_type': col('Location_type', 'Unknown'),
+            'distance_from_hub': col('dist_from_hub', 0).astype(float),
+            'workers_count': col('workers_num', 0).astype(int),
+            'product_shipped_tons': col('product_wg_ton', 0).astype(float),
+            'risk_score': col('risk_score', 0).astype(float)
+        }).to_dict('records')
+        
+        # Manager Entity (last warehouse wins for a repeated manager)
+        manager_id = col('WH_Manager_ID', np.nan)
+        entities['managers'] = (
+            pd.DataFrame({'manager_id': manager_id, 'warehouse_id': wh_id})
+            [manager_id.notna()]
+            .drop_duplicates(subset='manager_id', keep='last')
+            .to_dict('records')
+        )
+        
+        # Zone Entities
+        zone = col('zone', np.nan)
+        zones = zone[zone.notna()].drop_duplicates()
+        entities['zones'] = pd.DataFrame({
+            'zone_id': 'ZONE_' + zones.astype(str),
+            'zone_name': zones
+        }).to_dict('records')
+        
+        regional_zone = col('WH_regional_zone', np.nan)
+        mask = regional_zone.notna()
+        entities['regional_zones'] = pd.DataFrame({
+            'regional_zone_id': 'RZ_' + regional_zone[mask].astype(str),
+            'regional_zone_name': regional_zone[mask],
+            'parent_zone': col('zone', 'Unknown')[mask],
+            'warehouse_id': wh_id[mask]
+        }).to_dict('records')
+        
+        # Infrastructure Entity
+        entities['infrastructures'] = pd.DataFrame({
+            'infrastructure_id': 'INF_' + wh_str,
+            'warehouse_id': wh_str,
+            'has_temp_regulation': col('temp_reg_mach', 0).astype(int).astype(bool),
+            'has_electric_backup': col('electric_supply', 0).astype(int).astype(bool),
+            'is_flood_proof': col('flood_proof', 0).astype(int).astype(bool),
+            'certificate_type': col('approved_wh_govt_certificate', 'None').astype(str)
+        }).to_dict('records')
+        
+        # Risk Events
+        risk_events = []
+        
+        breakdowns = col('wh_breakdown_l3m', 0)
+        mask = breakdowns > 0
+        risk_events += pd.DataFrame({
+            'event_id': 'RISK_BREAKDOWN_' + wh_str[mask],
+            'warehouse_id': wh_id[mask],
+            'event_type': 'breakdown',
+            'occurrence_count': breakdowns[mask].astype(int),
+            'severity': np.where(breakdowns[mask] > 2, 'high', 'medium'),
+            'time_period': 'l3m'
+        }).to_dict('records')
+        
+        storage_issues = col('storage_issue_reported_l3m', 0)
+        mask = storage_issues > 0
+        risk_events += pd.DataFrame({
+            'event_id': 'RISK_STORAGE_' + wh_str[mask],
+            'warehouse_id': wh_id[mask],
+            'event_type': 'storage_issue',
+            'occurrence_count': storage_issues[mask].astype(int),
+            'severity': 'medium',
+            'time_period': 'l3m'
+        }).to_dict('records')
+        
+        mask = col('transport_issue_l1y', 0) > 0
+        risk_events += pd.DataFrame({
+            'event_id': 'RISK_TRANSPORT_' + wh_str[mask],
+            'warehouse_id': wh_id[mask],
+            'event_type': 'transport_issue',
+            'occurrence_count': 1,
+            'severity': 'high',
+            'time_period': 'l1y'
+        }).to_dict('records')
+        
+        entities['risk_events'] = risk_events
+        
+        # Market Context
+        entities['market_contexts'] = pd.DataFrame({
+            'market_id': 'MKT_' + wh_str,
+            'warehouse_id': wh_id,
+            'competitor_count': col('Competitor_in_mkt', 0).astype(int),
+            'retail_shop_count': col('retail_shop_num', 0).astype(int),
+            'distributor_count': col('distributor_num', 0).astype(int),
+            'is_flood_impacted': col('flood_impacted', 0).astype(bool)
+        }).to_dict('records')
+        
+        # Compliance
+        entities['compliances'] = pd.DataFrame({
+            'compliance_id': 'COMP_' + wh_str,
+            'warehouse_id': wh_id,
+            'govt_checks_l3m': col('govt_check_l3m', 0).astype(int),
+            'certificate_type': col('approved_wh_govt_certificate', 'None'),
+            'refill_requests_l3m': col('num_refill_req_l3m', 0).astype(int)
+        }).to_dict('records')
         
         logger.info(f"Extracted {sum(len(v) for v in entities.values())} total entities")
         return entities
     
+    def _column(self, name: str, default) -> pd.Series:
+        """Column by name, or a constant Series when the CSV lacks it"""
+        if name in self.df.columns:
+            return self.df[name]
+        return pd.Series(default, index=self.df.index)
+    
+    def check_engine_parity(self) -> bool:
+        """Whether the pyarrow and C parsers yield the same entities for this CSV"""
+        extracts = {}
+        for engine in ('pyarrow', 'c'):
+            self.load_data(engine)
+            self.clean_data()
+            self.calculate_risk_scores()
+            extracts[engine] = self.create_entity_extracts()
+        
+        matches = True
+        for key, rows in extracts['c'].items():
+            try:
+                pd.testing.assert_frame_equal(
+                    pd.DataFrame(extracts['pyarrow'][key]),
+                    pd.DataFrame(rows),
+                    check_dtype=False
+                )
+            except AssertionError as e:
+                logger.error(f"Entities differ between CSV engines for {key}: {e}")
+                matches = False
+        return matches
+    
     def run_pipeline(self) -> Tuple[pd.DataFrame, Dict]:
         """Execute full ingestion pipeline"""
         self.load_data()
@@ -216,7 +268,13 @@ class DataIngestion:
         return self.df, entities
 
 if __name__ == "__main__":
+    Config.ensure_valid()
+    
     ingestion = DataIngestion()
+    if '--check-engines' in sys.argv:
+        # Needs pyarrow installed; compares blank-cell handling of both parsers
+        sys.exit(0 if ingestion.check_engine_parity() else 1)
+    
     df, entities = ingestion.run_pipeline()
     print(f"\n📊 Summary:")
     print(f"  Warehouses: {len(entities['warehouses'])}")
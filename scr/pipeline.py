@@ -2,33 +2,51 @@
 12. SRC/PIPELINE.PY - Complete GraphRAG Pipeline
 """
 
+import copy
+import hashlib
 import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from loguru import logger
+from groq import Groq
 from time import time
 from config import Config
-from ingestion import DataIngestion
-from graph_bulider import GraphBuilder
 from query_generator import QueryGenerator
 from answer_generator import AnswerGenerator
 from executor import QueryExecutor
 
+# Separator around each query in the log
+_BANNER = '=' * 60
+
 class GraphRAGPipeline:
     """End-to-end GraphRAG pipeline for warehouse risk analysis"""
     
     def __init__(self):
         logger.info("Initializing GraphRAG Pipeline...")
-        self.query_generator = QueryGenerator()
+        # One Groq client (and its connection pool) shared by both LLM stages
+        self.llm_client = Groq(api_key=Config.GROQ_API_KEY)
+        self.query_generator = QueryGenerator(self.llm_client)
         self.executor = QueryExecutor()
-        self.answer_generator = AnswerGenerator()
+        self.answer_generator = AnswerGenerator(self.llm_client)
+        
+        # Full responses for repeated questions, most recently used last
+        self._result_cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+        
+        # Warehouse profiles/comparisons, stored with their expiry time
+        self._profile_cache: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._profile_cache_lock = threading.Lock()
         logger.info("✅ Pipeline initialized")
     
     def process_query(
         self, 
         user_query: str,
         use_templates: bool = True,
-        generate_recommendations: bool = False
+        generate_recommendations: bool = False,
+        on_token: Optional[Callable[[str], None]] = None
     ) -> Dict[str, Any]:
         """
         Complete query processing pipeline
@@ -37,17 +55,28 @@ class GraphRAGPipeline:
             user_query: Natural language query
             use_templates: Use predefined templates when available
             generate_recommendations: Generate actionable recommendations
+            on_token: Stream the answer, calling this with each text chunk
         
         Returns:
             Dictionary containing answer, results, metadata
         """
         start_time = time()
-        logger.info(f"\n{'='*60}\nProcessing query: {user_query}\n{'='*60}")
+        logger.info("\n{0}\nProcessing query: {1}\n{0}", _BANNER, user_query)
+        
+        cache_key = self._result_cache_key(user_query, use_templates, generate_recommendations)
+        cached = self._result_cache_get(cache_key)
+        if cached is not None:
+            logger.debug("✅ Query served from result cache")
+            cached['metadata']['cached'] = True
+            cached['metadata']['processing_time_seconds'] = round(time() - start_time, 2)
+            if on_token is not None:
+                on_token(cached['answer'])
+            return cached
         
         try:
             # Step 1: Generate Cypher query
-            logger.info("Step 1: Generating Cypher query...")
-            cypher_query, understanding = self.query_generator.process_query(
+            logger.debug("Step 1: Generating Cypher query...")
+            cypher_query, understanding, parameters = self.query_generator.process_query(
                 user_query, 
                 use_templates=use_templates
             )
@@ -56,28 +85,34 @@ class GraphRAGPipeline:
                 return self._error_response("Failed to generate valid query")
             
             # Step 2: Execute query
-            logger.info("Step 2: Executing graph query...")
-            execution_result = self.executor.execute_with_context(cypher_query)
+            logger.debug("Step 2: Executing graph query...")
+            execution_result = self.executor.execute_with_context(cypher_query, parameters)
             
             results = execution_result.get('results', [])
             context = execution_result.get('context', {})
+            execution_error = execution_result.get('error')
+            
+            if execution_error and not results:
+                self.query_generator.invalidate_plan(user_query, use_templates=use_templates)
+                return self._error_response(f"Graph query failed: {execution_error}")
             
             if not results:
                 return self._no_results_response(user_query, understanding)
             
             # Step 3: Generate answer
-            logger.info("Step 3: Generating answer...")
+            logger.debug("Step 3: Generating answer...")
             answer = self.answer_generator.generate_answer(
                 user_query,
                 results,
                 context,
-                understanding
+                understanding,
+                on_token=on_token
             )
             
             # Step 4: Optional recommendations
             recommendations = None
             if generate_recommendations and understanding.get('intent') == 'risk_identification':
-                logger.info("Step 4: Generating recommendations...")
+                logger.debug("Step 4: Generating recommendations...")
                 recommendations = self._generate_warehouse_recommendations(results)
             
             processing_time = time() - start_time
@@ -91,6 +126,7 @@ class GraphRAGPipeline:
                 "context": context,
                 "understanding": understanding,
                 "cypher_query": cypher_query,
+                "cypher_parameters": parameters,
                 "recommendations": recommendations,
                 "metadata": {
                     "processing_time_seconds": round(processing_time, 2),
@@ -100,27 +136,109 @@ class GraphRAGPipeline:
                 }
             }
             
-            logger.info(f"✅ Query processed in {processing_time:.2f} seconds")
+            logger.debug("✅ Query processed in {:.2f} seconds", processing_time)
+            # Failures may be transient, so only cache complete answers
+            if not execution_error and answer != self.answer_generator.ANSWER_ERROR:
+                self._result_cache_put(cache_key, response)
             return response
             
         except Exception as e:
-            logger.error(f"❌ Pipeline error: {e}", exc_info=True)
+            logger.error("❌ Pipeline error: {}", e, exc_info=True)
             return self._error_response(str(e))
     
+    def invalidate_cache(self):
+        """Drop cached query responses and profiles, e.g. after the graph is rebuilt"""
+        with self._result_cache_lock:
+            self._result_cache.clear()
+        with self._profile_cache_lock:
+            self._profile_cache.clear()
+        logger.info("Query result cache cleared")
+    
+    def _result_cache_key(
+        self,
+        user_query: str,
+        use_templates: bool,
+        generate_recommendations: bool
+    ) -> bytes:
+        """Cache key for a query, ignoring case and whitespace differences"""
+        normalized = " ".join(user_query.lower().split())
+        return hashlib.blake2b(
+            f"{normalized}|{use_templates}|{generate_recommendations}".encode(),
+            digest_size=16
+        ).digest()
+    
+    def _result_cache_get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """Copy of a cached response that has not expired, or None"""
+        with self._result_cache_lock:
+            entry = self._result_cache.get(key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at <= time():
+                del self._result_cache[key]
+                return None
+            self._result_cache.move_to_end(key)
+            return copy.deepcopy(response)
+    
+    def _result_cache_put(self, key: bytes, response: Dict[str, Any]):
+        """Store a copy of a successful response for Config.QUERY_CACHE_TTL seconds, evicting the least recently used"""
+        if Config.QUERY_CACHE_SIZE <= 0 or Config.QUERY_CACHE_TTL <= 0:
+            return
+        
+        with self._result_cache_lock:
+            self._result_cache[key] = (time() + Config.QUERY_CACHE_TTL, copy.deepcopy(response))
+            self._result_cache.move_to_end(key)
+            while len(self._result_cache) > Config.QUERY_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+    
+    def _profile_cache_get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Copy of a cached profile/comparison that has not expired, or None"""
+        with self._profile_cache_lock:
+            entry = self._profile_cache.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time():
+                del self._profile_cache[key]
+                return None
+            self._profile_cache.move_to_end(key)
+            return copy.deepcopy(value)
+    
+    def _profile_cache_put(self, key: Tuple, value: Dict[str, Any]):
+        """Store a copy of a profile/comparison for Config.PROFILE_CACHE_TTL seconds"""
+        if Config.PROFILE_CACHE_SIZE <= 0 or Config.PROFILE_CACHE_TTL <= 0:
+            return
+        
+        with self._profile_cache_lock:
+            self._profile_cache[key] = (time() + Config.PROFILE_CACHE_TTL, copy.deepcopy(value))
+            self._profile_cache.move_to_end(key)
+            while len(self._profile_cache) > Config.PROFILE_CACHE_SIZE:
+                self._profile_cache.popitem(last=False)
+    
     def batch_process(
         self, 
         queries: List[str]
     ) -> List[Dict[str, Any]]:
-        """Process multiple queries in batch"""
-        logger.info(f"Processing {len(queries)} queries in batch...")
-        results = []
+        """Process multiple queries in batch, up to Config.BATCH_CONCURRENCY at a time"""
+        logger.info("Processing {} queries in batch...", len(queries))
+        
+        # Repeated queries in one batch run once; running them concurrently
+        # would miss the result cache since neither has finished yet
+        unique_queries = list(dict.fromkeys(queries))
         
-        for i, query in enumerate(queries, 1):
-            logger.info(f"\nProcessing query {i}/{len(queries)}")
-            result = self.process_query(query)
-            results.append(result)
+        # Queries are independent and I/O-bound (Groq + Neo4j); map keeps input order
+        with ThreadPoolExecutor(max_workers=max(1, Config.BATCH_CONCURRENCY)) as pool:
+            by_query = dict(zip(unique_queries, pool.map(self.process_query, unique_queries)))
         
-        logger.info(f"✅ Batch processing completed: {len(results)} queries processed")
+        # Each position gets its own copy so callers can mutate results independently
+        seen = set()
+        results = []
+        for query in queries:
+            response = by_query[query]
+            results.append(copy.deepcopy(response) if query in seen else response)
+            seen.add(query)
+        
+        logger.info("✅ Batch processing completed: {} queries processed", len(results))
         return results
     
     def get_warehouse_profile(
@@ -128,11 +246,37 @@ class GraphRAGPipeline:
         warehouse_id: str
     ) -> Dict[str, Any]:
         """Get comprehensive warehouse profile with risk assessment"""
-        logger.info(f"Generating profile for warehouse: {warehouse_id}")
+        logger.info("Generating profile for warehouse: {}", warehouse_id)
+        
+        cache_key = ("profile", warehouse_id)
+        cached = self._profile_cache_get(cache_key)
+        if cached is not None:
+            logger.info("✅ Profile served from cache")
+            return cached
         
         # Query warehouse data
         cypher = """
         MATCH (w:Warehouse {warehouse_id: $warehouse_id})
+        CALL {
+            WITH w
+            MATCH (s:Warehouse)
+            WHERE s.location_type = w.location_type
+              AND s.risk_score > w.risk_score - 0.2
+              AND s.risk_score < w.risk_score + 0.2
+              AND s.warehouse_id <> w.warehouse_id
+            WITH w, s
+            ORDER BY abs(s.risk_score - w.risk_score)
+            LIMIT 5
+            OPTIONAL MATCH (s)-[:EXPERIENCED]->(sr:RiskEvent)
+            WITH w, s, COUNT(sr) as incident_count
+            ORDER BY abs(s.risk_score - w.risk_score)
+            RETURN collect({
+                warehouse_id: s.warehouse_id,
+                risk_score: s.risk_score,
+                shipped_tons: s.product_shipped_tons,
+                incident_count: incident_count
+            }) as similar_warehouses
+        }
         OPTIONAL MATCH (w)-[e:EXPERIENCED]->(r:RiskEvent)
         OPTIONAL MATCH (w)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
         OPTIONAL MATCH (w)-[:OPERATES_IN]->(m:MarketContext)
@@ -150,7 +294,8 @@ class GraphRAGPipeline:
                rz.regional_zone_name as region,
                z.zone_name as zone,
                c as compliance,
-               mgr.manager_id as manager_id
+               mgr.manager_id as manager_id,
+               similar_warehouses
         """
         
         results = self.executor.execute_query(cypher, {"warehouse_id": warehouse_id})
@@ -160,28 +305,35 @@ class GraphRAGPipeline:
         
         warehouse_data = results[0]
         
-        # Generate risk assessment
-        risk_assessment = self.answer_generator.generate_risk_assessment(
-            warehouse_id,
-            warehouse_data
-        )
-        
-        # Get similar warehouses for benchmarking
-        similar_warehouses = self._find_similar_warehouses(warehouse_data)
+        # Similar warehouses for benchmarking come back with the profile
+        similar_warehouses = warehouse_data.pop('similar_warehouses')
         
-        # Generate recommendations
-        recommendations = self.answer_generator.generate_recommendations(
-            warehouse_data,
-            similar_warehouses
-        )
+        # The risk assessment and recommendations are independent LLM calls,
+        # so the assessment runs on a worker while recommendations run here
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            risk_future = pool.submit(
+                self.answer_generator.generate_risk_assessment,
+                warehouse_id,
+                warehouse_data
+            )
+            
+            # Generate recommendations
+            recommendations = self.answer_generator.generate_recommendations(
+                warehouse_data,
+                similar_warehouses
+            )
+            
+            risk_assessment = risk_future.result()
         
-        return {
+        profile = {
             "warehouse_id": warehouse_id,
             "data": warehouse_data,
             "risk_assessment": risk_assessment,
             "recommendations": recommendations,
             "similar_warehouses": similar_warehouses[:5]
         }
+        self._profile_cache_put(cache_key, profile)
+        return profile
     
     def compare_warehouses(
         self, 
@@ -189,21 +341,29 @@ class GraphRAGPipeline:
         metrics: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """Compare multiple warehouses across metrics"""
-        logger.info(f"Comparing {len(warehouse_ids)} warehouses")
+        logger.info("Comparing {} warehouses", len(warehouse_ids))
         
         if metrics is None:
             metrics = ["risk_score", "incidents", "infrastructure", "performance"]
         
+        # Order matters to both the returned rows and the prompt, so it stays in the key
+        cache_key = ("compare", tuple(warehouse_ids), tuple(metrics))
+        cached = self._profile_cache_get(cache_key)
+        if cached is not None:
+            logger.info("✅ Comparison served from cache")
+            return cached
+        
         # Query warehouse data
         cypher = """
-        MATCH (w:Warehouse)
-        WHERE w.warehouse_id IN $warehouse_ids
-        OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+        UNWIND $warehouse_ids AS wid
+        MATCH (w:Warehouse {warehouse_id: wid})
+        CALL {
+            WITH w
+            OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+            RETURN COUNT(r) as incident_count,
+                   collect(DISTINCT r.event_type) as incident_types
+        }
         OPTIONAL MATCH (w)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
-        WITH w, 
-             COUNT(r) as incident_count,
-             collect(DISTINCT r.event_type) as incident_types,
-             i
         RETURN w.warehouse_id as warehouse_id,
                w.risk_score as risk_score,
                w.product_shipped_tons as shipped_tons,
@@ -222,41 +382,13 @@ class GraphRAGPipeline:
         # Generate comparison
         comparison = self.answer_generator.generate_comparison(warehouses, metrics)
         
-        return {
+        result = {
             "warehouses": warehouses,
             "comparison": comparison,
             "metrics_compared": metrics
         }
-    
-    def _find_similar_warehouses(
-        self, 
-        warehouse_data: Dict, 
-        limit: int = 5
-    ) -> List[Dict]:
-        """Find similar warehouses for benchmarking"""
-        cypher = """
-        MATCH (w:Warehouse)
-        WHERE w.warehouse_id <> $warehouse_id
-          AND w.location_type = $location_type
-          AND abs(w.risk_score - $risk_score) < 0.2
-        OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
-        WITH w, COUNT(r) as incident_count
-        RETURN w.warehouse_id as warehouse_id,
-               w.risk_score as risk_score,
-               w.product_shipped_tons as shipped_tons,
-               incident_count
-        ORDER BY abs(w.risk_score - $risk_score)
-        LIMIT $limit
-        """
-        
-        params = {
-            "warehouse_id": warehouse_data.get('w', {}).get('warehouse_id'),
-            "location_type": warehouse_data.get('w', {}).get('location_type'),
-            "risk_score": warehouse_data.get('w', {}).get('risk_score', 0.5),
-            "limit": limit
-        }
-        
-        return self.executor.execute_query(cypher, params)
+        self._profile_cache_put(cache_key, result)
+        return result
     
     def _generate_warehouse_recommendations(
         self, 
@@ -355,6 +487,10 @@ class GraphRAGPipeline:
             }
         }
     
+    def warm_up(self):
+        """Prime the Neo4j connection and query plans before the first request"""
+        self.executor.warm_up()
+    
     def close(self):
         """Close database connections"""
         self.executor.close()
@@ -3,13 +3,14 @@
 """
 
 # Query Understanding Prompt
-QUERY_UNDERSTANDING_PROMPT = """
-Analyze this warehouse supply chain query and extract structured information:
+# Static instructions go in the system message so every request shares the same
+# prompt prefix; only the short user message changes per query
+QUERY_UNDERSTANDING_SYSTEM = """You are an expert in warehouse risk management.
 
-Query: "{query}"
+Analyze warehouse supply chain queries and extract structured information.
 
 Return a JSON object with:
-{{
+{
     "intent": "<one of: risk_identification, performance_analysis, comparison, optimization, root_cause, prediction, exploration, reporting, filtering, aggregation, correlation, trend_analysis, anomaly_detection, compliance_check, capacity_analysis, location_analysis, manager_performance, infrastructure_assessment, market_analysis, general_lookup>",
     "entities": ["list of entities mentioned: warehouse_id, zone, manager, region, etc"],
     "risk_factors": ["breakdown", "storage_issue", "transport_issue", "flood", "power_outage", "temp_control", etc],
@@ -23,37 +24,32 @@ Return a JSON object with:
     "requires_aggregation": <true/false>,
     "requires_temporal_analysis": <true/false>,
     "requires_geospatial_analysis": <true/false>
-}}
+}
 
 Be comprehensive and specific. Consider the full range of warehouse analytics questions.
 Return ONLY valid JSON.
 """
 
-# Cypher Generation Prompt
-CYPHER_GENERATION_PROMPT = """
-Generate a Neo4j Cypher query for this warehouse supply chain analytics question.
+QUERY_UNDERSTANDING_PROMPT = """
+Analyze this warehouse supply chain query and extract structured information:
 
-Intent: {intent}
 Query: "{query}"
-Entities: {entities}
-Risk Factors: {risk_factors}
+"""
 
-Graph Schema:
-- Warehouse (warehouse_id, capacity_size, established_year, owner_type, location_type, distance_from_hub, workers_count, product_shipped_tons, risk_score)
+# Graph schema shared by the Cypher prompts
+GRAPH_SCHEMA = """- Warehouse (warehouse_id, capacity_size, established_year, owner_type, location_type, distance_from_hub, workers_count, product_shipped_tons, risk_score)
 - Manager (manager_id) -[:MANAGES]-> Warehouse
 - Zone (zone_id, zone_name) <-[:PART_OF]- RegionalZone (regional_zone_id, regional_zone_name) <-[:LOCATED_IN]- Warehouse
 - Infrastructure (infrastructure_id, has_temp_regulation, has_electric_backup, is_flood_proof, certificate_type) <-[:HAS_INFRASTRUCTURE]- Warehouse
 - RiskEvent (event_id, event_type, occurrence_count, severity, time_period) <-[:EXPERIENCED]- Warehouse
 - MarketContext (market_id, competitor_count, retail_shop_count, distributor_count, is_flood_impacted) <-[:OPERATES_IN]- Warehouse
-- Compliance (compliance_id, govt_checks_l3m, certificate_type, refill_requests_l3m) <-[:SUBJECT_TO]- Warehouse
+- Compliance (compliance_id, govt_checks_l3m, certificate_type, refill_requests_l3m) <-[:SUBJECT_TO]- Warehouse"""
 
-Query Understanding:
-- Complexity: {complexity}
-- Graph Pattern: {graph_pattern}
-- Data Focus: {data_focus}
-- Time Scope: {time_scope}
-- Requires Comparison: {requires_comparison}
-- Requires Aggregation: {requires_aggregation}
+# Cypher Generation Prompt
+CYPHER_GENERATION_SYSTEM = """You are an expert Neo4j Cypher query generator for warehouse risk management.
+
+Graph Schema:
+""" + GRAPH_SCHEMA + """
 
 Guidelines:
 1. Use MATCH for finding patterns, OPTIONAL MATCH for optional relationships
@@ -70,6 +66,23 @@ Guidelines:
 Return ONLY the Cypher query, no explanations or markdown formatting.
 """
 
+CYPHER_GENERATION_PROMPT = """
+Generate a Neo4j Cypher query for this warehouse supply chain analytics question.
+
+Intent: {intent}
+Query: "{query}"
+Entities: {entities}
+Risk Factors: {risk_factors}
+
+Query Understanding:
+- Complexity: {complexity}
+- Graph Pattern: {graph_pattern}
+- Data Focus: {data_focus}
+- Time Scope: {time_scope}
+- Requires Comparison: {requires_comparison}
+- Requires Aggregation: {requires_aggregation}
+"""
+
 # Answer Generation Prompt
 ANSWER_GENERATION_PROMPT = """
 Generate a comprehensive answer for this warehouse analysis query.
@@ -179,3 +192,48 @@ Provide a concise summary (2-3 sentences) highlighting:
 
 Be factual and data-focused.
 """
+
+# Combined understanding + Cypher Prompt (one LLM call)
+FUSED_QUERY_SYSTEM = """You are an expert Neo4j Cypher query generator for warehouse risk management.
+
+Analyze warehouse supply chain queries and write the Neo4j Cypher query that answers each one.
+
+Graph Schema:
+""" + GRAPH_SCHEMA + """
+
+Return a JSON object with exactly two keys:
+{
+    "understanding": {
+        "intent": "<one of: risk_identification, performance_analysis, comparison, optimization, root_cause, prediction, exploration, reporting, filtering, aggregation, correlation, trend_analysis, anomaly_detection, compliance_check, capacity_analysis, location_analysis, manager_performance, infrastructure_assessment, market_analysis, general_lookup>",
+        "entities": ["list of entities mentioned: warehouse_id, zone, manager, region, etc"],
+        "risk_factors": ["breakdown", "storage_issue", "transport_issue", "flood", "power_outage", "temp_control", etc],
+        "time_scope": "<current, historical, future, last_3m, last_6m, last_1y>",
+        "graph_pattern": "<simple_lookup, multi_hop, aggregation, path_finding, subgraph, complex_join>",
+        "complexity": "<basic, intermediate, advanced, expert>",
+        "data_focus": ["warehouses", "managers", "zones", "infrastructure", "risk_events", "compliance", "market"],
+        "output_format": "<summary, detailed, comparative, ranked, statistical>",
+        "filters": ["risk_score > 0.7", "location_type = 'Urban'", "has_electric_backup = false"],
+        "requires_comparison": <true/false>,
+        "requires_aggregation": <true/false>,
+        "requires_temporal_analysis": <true/false>,
+        "requires_geospatial_analysis": <true/false>
+    },
+    "cypher": "<the Cypher query as a single string>"
+}
+
+Cypher guidelines:
+1. Use MATCH for finding patterns, OPTIONAL MATCH for optional relationships
+2. Use WHERE for filtering with appropriate conditions
+3. Include ORDER BY and LIMIT for ranked results
+4. Use aggregation functions (COUNT, AVG, SUM, MIN, MAX) when analyzing metrics
+5. Include relevant properties with clear, descriptive aliases
+6. Ensure queries are efficient and avoid cartesian products
+
+Return ONLY valid JSON; the cypher value must contain no markdown formatting.
+"""
+
+FUSED_QUERY_PROMPT = """
+Analyze this warehouse supply chain query and write the Neo4j Cypher query that answers it.
+
+Query: "{query}"
+"""
@@ -2,25 +2,497 @@
 Query Generator - Convert natural language queries to Cypher using Groq
 """
 
+import copy
+import functools
 import json
-from typing import Dict, List, Optional, Tuple
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from loguru import logger
-from groq import Groq
+
+if TYPE_CHECKING:
+    import numpy as np
+    from groq import Groq
 
 from config import Config
 from prompt_templates import (
+    QUERY_UNDERSTANDING_SYSTEM,
     QUERY_UNDERSTANDING_PROMPT,
-    CYPHER_GENERATION_PROMPT
+    CYPHER_GENERATION_SYSTEM,
+    CYPHER_GENERATION_PROMPT,
+    FUSED_QUERY_SYSTEM,
+    FUSED_QUERY_PROMPT
 )
 
+# Values for understanding fields the LLM left out; lists are copied per use
+UNDERSTANDING_DEFAULTS = {
+    "time_scope": "current",
+    "graph_pattern": "simple",
+    "complexity": "medium",
+    "data_focus": ["warehouses"],
+    "output_format": "summary",
+    "filters": [],
+    "requires_comparison": False,
+    "requires_aggregation": False,
+    "requires_temporal_analysis": False,
+    "requires_geospatial_analysis": False
+}
+
+# Pre-defined Cypher for common query intents, keyed by template name
+_CYPHER_TEMPLATE_SOURCE = {
+    "high_risk_warehouses": """
+        MATCH (w:Warehouse)-[:EXPERIENCED]->(r:RiskEvent)
+        WHERE w.risk_score > 0.6
+        OPTIONAL MATCH (w)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
+        OPTIONAL MATCH (w)-[:OPERATES_IN]->(m:MarketContext)
+        WITH w, COUNT(r) as risk_count, i, m
+        RETURN w.warehouse_id as warehouse_id,
+               w.risk_score as risk_score,
+               w.location_type as location,
+               risk_count,
+               i.has_electric_backup as has_backup,
+               i.is_flood_proof as flood_proof,
+               m.is_flood_impacted as in_flood_zone
+        ORDER BY w.risk_score DESC
+        LIMIT 10
+    """,
+    
+    "warehouse_risk_profile": """
+        MATCH (w:Warehouse {warehouse_id: $warehouse_id})
+        OPTIONAL MATCH (w)-[e:EXPERIENCED]->(r:RiskEvent)
+        OPTIONAL MATCH (w)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
+        OPTIONAL MATCH (w)-[:OPERATES_IN]->(m:MarketContext)
+        OPTIONAL MATCH (w)-[:LOCATED_IN]->(rz:RegionalZone)-[:PART_OF]->(z:Zone)
+        RETURN w, 
+               collect(DISTINCT {type: r.event_type, count: r.occurrence_count, severity: r.severity}) as risks,
+               i,
+               m,
+               rz.regional_zone_name as region,
+               z.zone_name as zone
+    """,
+    
+    "zone_risk_comparison": """
+        MATCH (z:Zone)<-[:PART_OF]-(rz:RegionalZone)<-[:LOCATED_IN]-(w:Warehouse)
+        OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+        WITH z.zone_name as zone,
+             COUNT(DISTINCT w) as total_warehouses,
+             AVG(w.risk_score) as avg_risk_score,
+             COUNT(r) as total_incidents
+        RETURN zone, 
+               total_warehouses,
+               ROUND(avg_risk_score, 3) as avg_risk_score,
+               total_incidents,
+               ROUND(total_incidents * 1.0 / total_warehouses, 2) as incident_rate
+        ORDER BY avg_risk_score DESC
+    """,
+    
+    "infrastructure_impact": """
+        MATCH (w:Warehouse)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
+        OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+        WITH i.has_temp_regulation as has_temp_reg,
+             i.has_electric_backup as has_backup,
+             i.is_flood_proof as flood_proof,
+             COUNT(DISTINCT w) as warehouse_count,
+             AVG(w.risk_score) as avg_risk,
+             COUNT(r) as total_incidents
+        RETURN has_temp_reg, has_backup, flood_proof,
+               warehouse_count,
+               ROUND(avg_risk, 3) as avg_risk_score,
+               total_incidents
+        ORDER BY avg_risk_score
+    """,
+    
+    "manager_performance": """
+        MATCH (m:Manager)-[:MANAGES]->(w:Warehouse)
+        OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+        WITH m.manager_id as manager_id,
+             COUNT(DISTINCT w) as warehouses_managed,
+             AVG(w.risk_score) as avg_risk_score,
+             AVG(w.product_shipped_tons) as avg_shipment,
+             COUNT(r) as total_incidents
+        WHERE warehouses_managed > 0
+        RETURN manager_id,
+               warehouses_managed,
+               ROUND(avg_risk_score, 3) as avg_risk_score,
+               ROUND(avg_shipment, 2) as avg_shipment_tons,
+               total_incidents,
+               ROUND(total_incidents * 1.0 / warehouses_managed, 2) as incidents_per_warehouse
+        ORDER BY avg_risk_score ASC, avg_shipment DESC
+        LIMIT 15
+    """,
+    
+    "vulnerable_warehouses": """
+        MATCH (w:Warehouse)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
+        WHERE i.has_electric_backup = false
+          OR i.is_flood_proof = false
+        OPTIONAL MATCH (w)-[:OPERATES_IN]->(m:MarketContext)
+        WHERE m.is_flood_impacted = true
+        OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+        WITH w, i, m, COUNT(r) as incident_count
+        WHERE w.risk_score > 0.5 OR incident_count > 2
+        RETURN w.warehouse_id as warehouse_id,
+               w.risk_score as risk_score,
+               w.location_type as location,
+               i.has_electric_backup as has_backup,
+               i.is_flood_proof as flood_proof,
+               m.is_flood_impacted as in_flood_zone,
+               incident_count
+        ORDER BY w.risk_score DESC, incident_count DESC
+        LIMIT 10
+    """,
+    
+    "breakdown_patterns": """
+        MATCH (w:Warehouse)-[:EXPERIENCED]->(r:RiskEvent)
+        WHERE r.event_type = 'breakdown'
+        OPTIONAL MATCH (w)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
+        OPTIONAL MATCH (w)-[:LOCATED_IN]->(rz:RegionalZone)
+        WITH w, r, i, rz
+        RETURN w.warehouse_id as warehouse_id,
+               w.established_year as year_established,
+               r.occurrence_count as breakdown_count,
+               r.severity as severity,
+               i.has_electric_backup as has_backup,
+               i.has_temp_regulation as has_temp_control,
+               rz.regional_zone_name as region
+        ORDER BY r.occurrence_count DESC
+        LIMIT 15
+    """,
+    
+    "exploration": """
+        MATCH (w:Warehouse)
+        OPTIONAL MATCH (w)-[:LOCATED_IN]->(rz:RegionalZone)-[:PART_OF]->(z:Zone)
+        OPTIONAL MATCH (w)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
+        OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+        RETURN w.warehouse_id,
+               w.location_type,
+               w.capacity_size,
+               z.zone_name,
+               rz.regional_zone_name,
+               w.risk_score,
+               COUNT(r) as risk_events,
+               i.has_temp_regulation,
+               i.has_electric_backup,
+               i.is_flood_proof
+        ORDER BY w.warehouse_id
+        LIMIT 50
+    """,
+    
+    "capacity_analysis": """
+        MATCH (w:Warehouse)
+        OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+        WITH w, COUNT(r) as incident_count
+        RETURN w.capacity_size,
+               COUNT(w) as warehouse_count,
+               AVG(w.risk_score) as avg_risk,
+               AVG(w.product_shipped_tons) as avg_shipment,
+               SUM(incident_count) as total_incidents,
+               AVG(incident_count) as avg_incidents_per_warehouse
+        ORDER BY w.capacity_size
+    """,
+    
+    "infrastructure_gaps": """
+        MATCH (w:Warehouse)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
+        WHERE i.has_electric_backup = false 
+           OR i.is_flood_proof = false 
+           OR i.has_temp_regulation = false
+        OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+        RETURN w.warehouse_id,
+               w.risk_score,
+               i.has_temp_regulation,
+               i.has_electric_backup,
+               i.is_flood_proof,
+               COUNT(r) as risk_events,
+               CASE 
+                 WHEN i.has_electric_backup = false AND i.is_flood_proof = false THEN 'Critical'
+                 WHEN i.has_electric_backup = false OR i.is_flood_proof = false THEN 'High'
+                 ELSE 'Medium'
+               END as vulnerability_level
+        ORDER BY w.risk_score DESC
+        LIMIT 20
+    """,
+    
+    "market_risk_correlation": """
+        MATCH (w:Warehouse)-[:OPERATES_IN]->(m:MarketContext)
+        OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+        WITH m, COUNT(DISTINCT w) as warehouses_in_market,
+             AVG(w.risk_score) as avg_warehouse_risk,
+             COUNT(r) as total_market_risk_events,
+             SUM(m.competitor_count) as total_competitors,
+             SUM(m.retail_shop_count) as total_retail_shops
+        RETURN m.market_id,
+               warehouses_in_market,
+               ROUND(avg_warehouse_risk, 3) as avg_risk_score,
+               total_market_risk_events,
+               ROUND(total_market_risk_events * 1.0 / warehouses_in_market, 2) as risk_per_warehouse,
+               total_competitors,
+               total_retail_shops,
+               m.is_flood_impacted
+        ORDER BY avg_warehouse_risk DESC
+    """,
+    
+    "performance_metrics": """
+        MATCH (w:Warehouse)
+        OPTIONAL MATCH (w)-[:MANAGES]->(mgr:Manager)
+        OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+        WITH mgr, COUNT(DISTINCT w) as warehouses_managed,
+             AVG(w.risk_score) as avg_risk,
+             AVG(w.product_shipped_tons) as avg_shipments,
+             COUNT(r) as total_risk_events
+        WHERE warehouses_managed > 0
+        RETURN mgr.manager_id,
+               warehouses_managed,
+               ROUND(avg_risk, 3) as avg_warehouse_risk,
+               ROUND(avg_shipments, 2) as avg_shipments_per_warehouse,
+               total_risk_events,
+               ROUND(total_risk_events * 1.0 / warehouses_managed, 2) as risk_events_per_warehouse
+        ORDER BY avg_risk ASC, avg_shipments DESC
+    """,
+    
+    "location_risk_analysis": """
+        MATCH (w:Warehouse)-[:LOCATED_IN]->(rz:RegionalZone)-[:PART_OF]->(z:Zone)
+        OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+        WITH z.zone_name as zone, rz.regional_zone_name as region,
+             COUNT(DISTINCT w) as warehouses_in_region,
+             AVG(w.risk_score) as avg_risk,
+             COUNT(r) as total_incidents,
+             SUM(CASE WHEN w.location_type = 'Urban' THEN 1 ELSE 0 END) as urban_count,
+             SUM(CASE WHEN w.location_type = 'Rural' THEN 1 ELSE 0 END) as rural_count
+        RETURN zone,
+               region,
+               warehouses_in_region,
+               ROUND(avg_risk, 3) as avg_risk_score,
+               total_incidents,
+               ROUND(total_incidents * 1.0 / warehouses_in_region, 2) as incidents_per_warehouse,
+               urban_count,
+               rural_count
+        ORDER BY avg_risk DESC
+    """,
+    
+    "temporal_risk_trends": """
+        MATCH (w:Warehouse)-[:EXPERIENCED]->(r:RiskEvent)
+        WHERE r.time_period = 'l3m'
+        WITH r.event_type as event_type,
+             COUNT(r) as recent_events,
+             AVG(r.severity) as avg_severity,
+             COUNT(DISTINCT w) as affected_warehouses
+        RETURN event_type,
+               recent_events,
+               ROUND(avg_severity, 2) as avg_severity,
+               affected_warehouses,
+               ROUND(recent_events * 1.0 / affected_warehouses, 2) as events_per_affected_warehouse
+        ORDER BY recent_events DESC
+        LIMIT 10
+    """,
+    
+    "compliance_overview": """
+        MATCH (w:Warehouse)-[:SUBJECT_TO]->(c:Compliance)
+        OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
+        WITH c, COUNT(DISTINCT w) as warehouses_under_compliance,
+             AVG(w.risk_score) as avg_risk_under_compliance,
+             COUNT(r) as total_risk_events,
+             AVG(c.govt_checks_l3m) as avg_govt_checks,
+             AVG(c.refill_requests_l3m) as avg_refill_requests
+        RETURN c.certificate_type,
+               warehouses_under_compliance,
+               ROUND(avg_risk_under_compliance, 3) as avg_risk_score,
+               total_risk_events,
+               ROUND(avg_govt_checks, 1) as avg_govt_checks_per_warehouse,
+               ROUND(avg_refill_requests, 1) as avg_refill_requests_per_warehouse
+        ORDER BY avg_risk_under_compliance DESC
+    """
+}
+
+# Stripped once here so template hits are returned as-is
+CYPHER_TEMPLATES = {name: cypher.strip() for name, cypher in _CYPHER_TEMPLATE_SOURCE.items()}
+
+class SemanticCache:
+    """Reuse query understandings across paraphrased questions via sentence embeddings"""
+    
+    # Tokens containing digits (warehouse IDs, months, counts) must match exactly,
+    # since embeddings barely separate "WH_0001" from "WH_0050"
+    IDENTIFIER_PATTERN = re.compile(r"\w*\d\w*")
+    
+    # Likewise for the categorical values and qualifiers queries filter on, which
+    # embeddings treat as near-synonyms ("Urban"/"Rural", "with"/"without")
+    FILTER_TERM_PATTERN = re.compile(
+        r"\b(?:urban|rural|small|mid|medium|large|north|south|east|west|rented|owned"
+        r"|flood|electric|temperature|high|higher|highest|low|lower|lowest|most|least"
+        r"|no|not|without|lack|lacking|missing)\b"
+        r"|\b(?:grade|certificate|certified)\s+[abc]\+?(?!\w)|\b[abc]\+?\s+(?:grade|certificate|certified)\b",
+        re.IGNORECASE
+    )
+    
+    def __init__(self, threshold: float = Config.SEMANTIC_CACHE_THRESHOLD, max_size: int = 256):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.enabled = True
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._embed = functools.lru_cache(maxsize=64)(self._encode)
+        
+        # Row i of _vectors is the normalized embedding of _entries[i],
+        # stored as (normalized query, identifiers, understanding)
+        self._vectors: Optional["np.ndarray"] = None
+        self._entries: List[Tuple[str, frozenset, Dict]] = []
+        self._lock = threading.Lock()
+    
+    def get(self, query: str) -> Optional[Dict]:
+        """Copy of the understanding stored for the closest similar query, or None"""
+        if not self.enabled or not self._entries:
+            return None
+        
+        import numpy as np
+        
+        try:
+            vector = self._embed(query)
+        except Exception as e:
+            self._disable(e)
+            return None
+        
+        identifiers = self._identifiers(query)
+        with self._lock:
+            scores = self._vectors @ vector
+            for index in np.argsort(-scores):
+                if scores[index] < self.threshold:
+                    break
+                _, entry_identifiers, understanding = self._entries[index]
+                if entry_identifiers == identifiers:
+                    return copy.deepcopy(understanding)
+        return None
+    
+    def put(self, query: str, understanding: Dict):
+        """Store an understanding, replacing one for the same query or evicting the oldest entry when full"""
+        if not self.enabled:
+            return
+        
+        import numpy as np
+        
+        try:
+            vector = self._embed(query)
+        except Exception as e:
+            self._disable(e)
+            return
+        
+        normalized = " ".join(query.lower().split())
+        entry = (normalized, self._identifiers(query), copy.deepcopy(understanding))
+        with self._lock:
+            for index, (entry_query, _, _) in enumerate(self._entries):
+                if entry_query == normalized:
+                    self._vectors[index] = vector
+                    self._entries[index] = entry
+                    return
+            
+            row = vector[np.newaxis, :]
+            self._vectors = row if self._vectors is None else np.vstack([self._vectors, row])
+            self._entries.append(entry)
+            if len(self._entries) > self.max_size:
+                self._vectors = self._vectors[1:]
+                self._entries.pop(0)
+    
+    def _encode(self, query: str) -> "np.ndarray":
+        """Normalized embedding of a query, loading the model on first use"""
+        import numpy as np
+        
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(Config.EMBEDDINGS_MODEL)
+        text = " ".join(query.lower().split())
+        return self._model.encode(text, normalize_embeddings=True).astype(np.float32)
+    
+    def _identifiers(self, query: str) -> frozenset:
+        """Tokens that must be identical for two queries to share an understanding"""
+        upper = query.upper()
+        return frozenset(
+            self.IDENTIFIER_PATTERN.findall(upper)
+            + [" ".join(term.split()) for term in self.FILTER_TERM_PATTERN.findall(upper)]
+        )
+    
+    def _disable(self, error: Exception):
+        logger.error(f"Semantic cache disabled: {error}")
+        self.enabled = False
+
 class QueryGenerator:
-    def __init__(self):
-        self.client = Groq(api_key=Config.GROQ_API_KEY)
+    PLAN_CACHE_SIZE = 256
+    
+    # Seconds a plan is reused, so prompt or schema changes take effect eventually
+    PLAN_TTL = 3600
+    
+    # Seconds a fallback plan is reused after its question failed to parse or
+    # validate, so a repeat does not pay for the same failing LLM calls
+    FALLBACK_PLAN_TTL = 300
+    
+    # Opening keywords of an accepted Cypher query
+    CYPHER_PREFIXES = ('MATCH', 'CREATE', 'MERGE')
+    
+    # Intents from QUERY_UNDERSTANDING_PROMPT answered by a template, but only when
+    # the question asks for exactly what the template computes (the phrase matches)
+    # and carries no filters or named entities; anything else goes to the LLM
+    INTENT_TEMPLATES = {
+        "risk_identification": (
+            "high_risk_warehouses",
+            re.compile(r"\b(?:high(?:est)?|top|most)[\s-]+risk|\briskiest\b", re.IGNORECASE)
+        ),
+        "comparison": (
+            "zone_risk_comparison",
+            re.compile(r"\b(?:across|between|by|per)\s+(?:all\s+|the\s+)?zones\b", re.IGNORECASE)
+        ),
+        "infrastructure_assessment": (
+            "infrastructure_gaps",
+            re.compile(r"\binfrastructure\s+(?:gaps?|weakness(?:es)?)\b", re.IGNORECASE)
+        ),
+        "market_analysis": (
+            "market_risk_correlation",
+            re.compile(r"\bmarket\s+risk\b|\brisk\s+(?:by|across|per)\s+markets?\b", re.IGNORECASE)
+        ),
+        "location_analysis": (
+            "location_risk_analysis",
+            re.compile(r"\b(?:regional|location)\s+risk\b|\brisk\s+(?:by|across|per)\s+(?:regions?|locations?)\b", re.IGNORECASE)
+        ),
+        "trend_analysis": (
+            "temporal_risk_trends",
+            re.compile(r"\brisk\s+trends?\b|\brecent\s+(?:risk|incident)s?\b", re.IGNORECASE)
+        ),
+        "compliance_check": (
+            "compliance_overview",
+            re.compile(r"\bcompliance\s+(?:overview|summary)\b|\brisk\s+by\s+certificate\b", re.IGNORECASE)
+        ),
+    }
+    
+    # Concrete warehouse/manager IDs, regional zones and zone names in the data
+    ENTITY_ID_PATTERN = re.compile(
+        r"\b(?:WH|EID)_\d+\b|\bzone[\s_]*\d+\b|\b(?:north|south|east|west)\b",
+        re.IGNORECASE
+    )
+    
+    def __init__(self, client: Optional["Groq"] = None):
+        if client is None:
+            # Imported here so loading templates/helpers does not pull in the HTTP stack
+            from groq import Groq
+            client = Groq(api_key=Config.GROQ_API_KEY)
+        self.client = client
         self.model = Config.GROQ_MODEL
         
+        # (normalized query, use_templates) -> (expires_at, is_fallback, (cypher, understanding, parameters))
+        self._plan_cache: "OrderedDict[Tuple[str, bool], Tuple[float, bool, Tuple[str, Dict, Dict]]]" = OrderedDict()
+        self._plan_lock = threading.Lock()
+        self.fallback_plan_hits = 0
+        
+        # Understandings of earlier paraphrases of a question
+        self.semantic_cache = SemanticCache() if Config.ENABLE_SEMANTIC_CACHE else None
+        
     def understand_query(self, query: str) -> Dict:
         """Parse and understand user's natural language query"""
-        logger.info(f"Understanding query: {query}")
+        logger.info("Understanding query: {}", query)
+        
+        if self.semantic_cache is not None:
+            understanding = self.semantic_cache.get(query)
+            if understanding is not None:
+                logger.info("Using understanding of a similar earlier query")
+                return understanding
         
         prompt = QUERY_UNDERSTANDING_PROMPT.format(query=query)
         
@@ -28,58 +500,41 @@ class QueryGenerator:
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": "You are an expert in warehouse risk management."},
+                    {"role": "system", "content": QUERY_UNDERSTANDING_SYSTEM},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=Config.LLM_TEMPERATURE,
-                max_tokens=1000
+                max_tokens=1000,
+                # JSON mode: the model must return a single valid JSON object
+                response_format={"type": "json_object"}
             )
             
             response_text = response.choices[0].message.content
             
             # Parse JSON response
             understanding = json.loads(response_text)
-            logger.info(f"Query intent: {understanding.get('intent')}")
+            logger.info("Query intent: {}", understanding.get('intent'))
+            if self.semantic_cache is not None:
+                self.semantic_cache.put(query, understanding)
             return understanding
             
         except json.JSONDecodeError:
             logger.error("Failed to parse query understanding")
-            return {
-                "intent": "general_query",
-                "entities": [],
-                "risk_factors": [],
-                "time_scope": "current",
-                "graph_pattern": "simple",
-                "complexity": "medium",
-                "data_focus": ["warehouses"],
-                "output_format": "summary",
-                "filters": [],
-                "requires_comparison": False,
-                "requires_aggregation": False,
-                "requires_temporal_analysis": False,
-                "requires_geospatial_analysis": False
-            }
+            return self._default_understanding("general_query")
             
         except Exception as e:
             logger.error(f"Error in query understanding: {e}")
-            return {
-                "intent": "error", 
-                "entities": [], 
-                "risk_factors": [],
-                "time_scope": "current",
-                "graph_pattern": "simple",
-                "complexity": "medium",
-                "data_focus": ["warehouses"],
-                "output_format": "summary",
-                "filters": [],
-                "requires_comparison": False,
-                "requires_aggregation": False,
-                "requires_temporal_analysis": False,
-                "requires_geospatial_analysis": False
-            }
+            return self._default_understanding("error")
+
+    def _default_understanding(self, intent: str) -> Dict:
+        """Understanding used when the LLM reply cannot be parsed"""
+        understanding = {"intent": intent, "entities": [], "risk_factors": []}
+        for key, value in UNDERSTANDING_DEFAULTS.items():
+            understanding[key] = copy.copy(value)
+        return understanding
 
-    def generate_cypher(self, query: str, understanding: Dict) -> str:
-        """Generate Cypher query from natural language"""
+    def generate_cypher(self, query: str, understanding: Dict) -> Optional[str]:
+        """Generate Cypher query from natural language; None if the LLM call fails"""
         logger.info("Generating Cypher query...")
         
         prompt = CYPHER_GENERATION_PROMPT.format(
@@ -99,327 +554,205 @@ class QueryGenerator:
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": "You are an expert Neo4j Cypher query generator for warehouse risk management."},
+                    {"role": "system", "content": CYPHER_GENERATION_SYSTEM},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=Config.LLM_TEMPERATURE,
-                max_tokens=1500
+                max_tokens=1500,
+                stream=True
             )
             
-            cypher_query = response.choices[0].message.content.strip()
+            # Stream so a reply that is not a query (e.g. prose) can be cut off
+            # after its first words instead of paying for the full completion
+            parts = []
+            prefix_ok = None
+            try:
+                for chunk in response:
+                    token = chunk.choices[0].delta.content
+                    if not token:
+                        continue
+                    parts.append(token)
+                    if prefix_ok is None:
+                        prefix_ok = self._check_cypher_prefix("".join(parts))
+                        if prefix_ok is False:
+                            logger.warning("Generated text is not a Cypher query, stopping early")
+                            return ""
+            finally:
+                response.close()
+            
+            cypher_query = "".join(parts).strip()
             
             # Clean up the query
             cypher_query = cypher_query.replace("```cypher", "").replace("```", "").strip()
             
-            logger.info(f"Generated Cypher:\n{cypher_query}")
+            logger.info("Generated Cypher:\n{}", cypher_query)
             return cypher_query
             
         except Exception as e:
             logger.error(f"Error generating Cypher: {e}")
-            return ""
+            return None
 
-    def get_template_query(self, intent: str, entities: List[str]) -> Optional[str]:
-        """Get pre-defined Cypher template for common queries"""
+    def understand_and_generate(self, query: str) -> Optional[Tuple[str, Dict]]:
+        """Understand a query and generate its Cypher in one LLM call; None on failure"""
+        logger.info("Understanding query and generating Cypher: {}", query)
         
-        templates = {
-            "high_risk_warehouses": """
-                MATCH (w:Warehouse)-[:EXPERIENCED]->(r:RiskEvent)
-                WHERE w.risk_score > 0.6
-                OPTIONAL MATCH (w)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
-                OPTIONAL MATCH (w)-[:OPERATES_IN]->(m:MarketContext)
-                WITH w, COUNT(r) as risk_count, i, m
-                RETURN w.warehouse_id as warehouse_id,
-                       w.risk_score as risk_score,
-                       w.location_type as location,
-                       risk_count,
-                       i.has_electric_backup as has_backup,
-                       i.is_flood_proof as flood_proof,
-                       m.is_flood_impacted as in_flood_zone
-                ORDER BY w.risk_score DESC
-                LIMIT 10
-            """,
-            
-            "warehouse_risk_profile": """
-                MATCH (w:Warehouse {warehouse_id: $warehouse_id})
-                OPTIONAL MATCH (w)-[e:EXPERIENCED]->(r:RiskEvent)
-                OPTIONAL MATCH (w)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
-                OPTIONAL MATCH (w)-[:OPERATES_IN]->(m:MarketContext)
-                OPTIONAL MATCH (w)-[:LOCATED_IN]->(rz:RegionalZone)-[:PART_OF]->(z:Zone)
-                RETURN w, 
-                       collect(DISTINCT {type: r.event_type, count: r.occurrence_count, severity: r.severity}) as risks,
-                       i,
-                       m,
-                       rz.regional_zone_name as region,
-                       z.zone_name as zone
-            """,
-            
-            "zone_risk_comparison": """
-                MATCH (z:Zone)<-[:PART_OF]-(rz:RegionalZone)<-[:LOCATED_IN]-(w:Warehouse)
-                OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
-                WITH z.zone_name as zone,
-                     COUNT(DISTINCT w) as total_warehouses,
-                     AVG(w.risk_score) as avg_risk_score,
-                     COUNT(r) as total_incidents
-                RETURN zone, 
-                       total_warehouses,
-                       ROUND(avg_risk_score, 3) as avg_risk_score,
-                       total_incidents,
-                       ROUND(total_incidents * 1.0 / total_warehouses, 2) as incident_rate
-                ORDER BY avg_risk_score DESC
-            """,
-            
-            "infrastructure_impact": """
-                MATCH (w:Warehouse)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
-                OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
-                WITH i.has_temp_regulation as has_temp_reg,
-                     i.has_electric_backup as has_backup,
-                     i.is_flood_proof as flood_proof,
-                     COUNT(DISTINCT w) as warehouse_count,
-                     AVG(w.risk_score) as avg_risk,
-                     COUNT(r) as total_incidents
-                RETURN has_temp_reg, has_backup, flood_proof,
-                       warehouse_count,
-                       ROUND(avg_risk, 3) as avg_risk_score,
-                       total_incidents
-                ORDER BY avg_risk_score
-            """,
-            
-            "manager_performance": """
-                MATCH (m:Manager)-[:MANAGES]->(w:Warehouse)
-                OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
-                WITH m.manager_id as manager_id,
-                     COUNT(DISTINCT w) as warehouses_managed,
-                     AVG(w.risk_score) as avg_risk_score,
-                     AVG(w.product_shipped_tons) as avg_shipment,
-                     COUNT(r) as total_incidents
-                WHERE warehouses_managed > 0
-                RETURN manager_id,
-                       warehouses_managed,
-                       ROUND(avg_risk_score, 3) as avg_risk_score,
-                       ROUND(avg_shipment, 2) as avg_shipment_tons,
-                       total_incidents,
-                       ROUND(total_incidents * 1.0 / warehouses_managed, 2) as incidents_per_warehouse
-                ORDER BY avg_risk_score ASC, avg_shipment DESC
-                LIMIT 15
-            """,
-            
-            "vulnerable_warehouses": """
-                MATCH (w:Warehouse)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
-                WHERE i.has_electric_backup = false
-                  OR i.is_flood_proof = false
-                OPTIONAL MATCH (w)-[:OPERATES_IN]->(m:MarketContext)
-                WHERE m.is_flood_impacted = true
-                OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
-                WITH w, i, m, COUNT(r) as incident_count
-                WHERE w.risk_score > 0.5 OR incident_count > 2
-                RETURN w.warehouse_id as warehouse_id,
-                       w.risk_score as risk_score,
-                       w.location_type as location,
-                       i.has_electric_backup as has_backup,
-                       i.is_flood_proof as flood_proof,
-                       m.is_flood_impacted as in_flood_zone,
-                       incident_count
-                ORDER BY w.risk_score DESC, incident_count DESC
-                LIMIT 10
-            """,
-            
-            "breakdown_patterns": """
-                MATCH (w:Warehouse)-[:EXPERIENCED]->(r:RiskEvent)
-                WHERE r.event_type = 'breakdown'
-                OPTIONAL MATCH (w)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
-                OPTIONAL MATCH (w)-[:LOCATED_IN]->(rz:RegionalZone)
-                WITH w, r, i, rz
-                RETURN w.warehouse_id as warehouse_id,
-                       w.established_year as year_established,
-                       r.occurrence_count as breakdown_count,
-                       r.severity as severity,
-                       i.has_electric_backup as has_backup,
-                       i.has_temp_regulation as has_temp_control,
-                       rz.regional_zone_name as region
-                ORDER BY r.occurrence_count DESC
-                LIMIT 15
-            """,
-            
-            "exploration": """
-                MATCH (w:Warehouse)
-                OPTIONAL MATCH (w)-[:LOCATED_IN]->(rz:RegionalZone)-[:PART_OF]->(z:Zone)
-                OPTIONAL MATCH (w)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
-                OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
-                RETURN w.warehouse_id,
-                       w.location_type,
-                       w.capacity_size,
-                       z.zone_name,
-                       rz.regional_zone_name,
-                       w.risk_score,
-                       COUNT(r) as risk_events,
-                       i.has_temp_regulation,
-                       i.has_electric_backup,
-                       i.is_flood_proof
-                ORDER BY w.warehouse_id
-                LIMIT 50
-            """,
-            
-            "capacity_analysis": """
-                MATCH (w:Warehouse)
-                OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
-                WITH w, COUNT(r) as incident_count
-                RETURN w.capacity_size,
-                       COUNT(w) as warehouse_count,
-                       AVG(w.risk_score) as avg_risk,
-                       AVG(w.product_shipped_tons) as avg_shipment,
-                       SUM(incident_count) as total_incidents,
-                       AVG(incident_count) as avg_incidents_per_warehouse
-                ORDER BY w.capacity_size
-            """,
-            
-            "infrastructure_gaps": """
-                MATCH (w:Warehouse)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
-                WHERE i.has_electric_backup = false 
-                   OR i.is_flood_proof = false 
-                   OR i.has_temp_regulation = false
-                OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
-                RETURN w.warehouse_id,
-                       w.risk_score,
-                       i.has_temp_regulation,
-                       i.has_electric_backup,
-                       i.is_flood_proof,
-                       COUNT(r) as risk_events,
-                       CASE 
-                         WHEN i.has_electric_backup = false AND i.is_flood_proof = false THEN 'Critical'
-                         WHEN i.has_electric_backup = false OR i.is_flood_proof = false THEN 'High'
-                         ELSE 'Medium'
-                       END as vulnerability_level
-                ORDER BY w.risk_score DESC
-                LIMIT 20
-            """,
-            
-            "market_risk_correlation": """
-                MATCH (w:Warehouse)-[:OPERATES_IN]->(m:MarketContext)
-                OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
-                WITH m, COUNT(DISTINCT w) as warehouses_in_market,
-                     AVG(w.risk_score) as avg_warehouse_risk,
-                     COUNT(r) as total_market_risk_events,
-                     SUM(m.competitor_count) as total_competitors,
-                     SUM(m.retail_shop_count) as total_retail_shops
-                RETURN m.market_id,
-                       warehouses_in_market,
-                       ROUND(avg_warehouse_risk, 3) as avg_risk_score,
-                       total_market_risk_events,
-                       ROUND(total_market_risk_events * 1.0 / warehouses_in_market, 2) as risk_per_warehouse,
-                       total_competitors,
-                       total_retail_shops,
-                       m.is_flood_impacted
-                ORDER BY avg_warehouse_risk DESC
-            """,
+        prompt = FUSED_QUERY_PROMPT.format(query=query)
+        
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": FUSED_QUERY_SYSTEM},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=Config.LLM_TEMPERATURE,
+                max_tokens=2000,
+                response_format={"type": "json_object"}
+            )
             
-            "performance_metrics": """
-                MATCH (w:Warehouse)
-                OPTIONAL MATCH (w)-[:MANAGES]->(mgr:Manager)
-                OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
-                WITH mgr, COUNT(DISTINCT w) as warehouses_managed,
-                     AVG(w.risk_score) as avg_risk,
-                     AVG(w.product_shipped_tons) as avg_shipments,
-                     COUNT(r) as total_risk_events
-                WHERE warehouses_managed > 0
-                RETURN mgr.manager_id,
-                       warehouses_managed,
-                       ROUND(avg_risk, 3) as avg_warehouse_risk,
-                       ROUND(avg_shipments, 2) as avg_shipments_per_warehouse,
-                       total_risk_events,
-                       ROUND(total_risk_events * 1.0 / warehouses_managed, 2) as risk_events_per_warehouse
-                ORDER BY avg_risk ASC, avg_shipments DESC
-            """,
+            payload = json.loads(response.choices[0].message.content)
+            understanding = payload.get('understanding')
+            cypher_query = payload.get('cypher')
+            if not isinstance(understanding, dict) or not isinstance(cypher_query, str):
+                raise ValueError("response is missing 'understanding' or 'cypher'")
             
-            "location_risk_analysis": """
-                MATCH (w:Warehouse)-[:LOCATED_IN]->(rz:RegionalZone)-[:PART_OF]->(z:Zone)
-                OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
-                WITH z.zone_name as zone, rz.regional_zone_name as region,
-                     COUNT(DISTINCT w) as warehouses_in_region,
-                     AVG(w.risk_score) as avg_risk,
-                     COUNT(r) as total_incidents,
-                     SUM(CASE WHEN w.location_type = 'Urban' THEN 1 ELSE 0 END) as urban_count,
-                     SUM(CASE WHEN w.location_type = 'Rural' THEN 1 ELSE 0 END) as rural_count
-                RETURN zone,
-                       region,
-                       warehouses_in_region,
-                       ROUND(avg_risk, 3) as avg_risk_score,
-                       total_incidents,
-                       ROUND(total_incidents * 1.0 / warehouses_in_region, 2) as incidents_per_warehouse,
-                       urban_count,
-                       rural_count
-                ORDER BY avg_risk DESC
-            """,
+            cypher_query = cypher_query.replace("```cypher", "").replace("```", "").strip()
             
-            "temporal_risk_trends": """
-                MATCH (w:Warehouse)-[:EXPERIENCED]->(r:RiskEvent)
-                WHERE r.time_period = 'l3m'
-                WITH r.event_type as event_type,
-                     COUNT(r) as recent_events,
-                     AVG(r.severity) as avg_severity,
-                     COUNT(DISTINCT w) as affected_warehouses
-                RETURN event_type,
-                       recent_events,
-                       ROUND(avg_severity, 2) as avg_severity,
-                       affected_warehouses,
-                       ROUND(recent_events * 1.0 / affected_warehouses, 2) as events_per_affected_warehouse
-                ORDER BY recent_events DESC
-                LIMIT 10
-            """,
+            logger.info("Query intent: {}", understanding.get('intent'))
+            logger.info("Generated Cypher:\n{}", cypher_query)
+            return cypher_query, understanding
             
-            "compliance_overview": """
-                MATCH (w:Warehouse)-[:SUBJECT_TO]->(c:Compliance)
-                OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
-                WITH c, COUNT(DISTINCT w) as warehouses_under_compliance,
-                     AVG(w.risk_score) as avg_risk_under_compliance,
-                     COUNT(r) as total_risk_events,
-                     AVG(c.govt_checks_l3m) as avg_govt_checks,
-                     AVG(c.refill_requests_l3m) as avg_refill_requests
-                RETURN c.certificate_type,
-                       warehouses_under_compliance,
-                       ROUND(avg_risk_under_compliance, 3) as avg_risk_score,
-                       total_risk_events,
-                       ROUND(avg_govt_checks, 1) as avg_govt_checks_per_warehouse,
-                       ROUND(avg_refill_requests, 1) as avg_refill_requests_per_warehouse
-                ORDER BY avg_risk_under_compliance DESC
-            """
-        }
-        
-        return templates.get(intent)
+        except Exception as e:
+            logger.error(f"Error in combined query planning: {e}")
+            return None
 
-    def process_query(self, query: str, use_templates: bool = True) -> Tuple[str, Dict]:
-        """Complete query processing pipeline"""
-        understanding = self.understand_query(query)
+    def get_template_query(self, intent: str, entities: List[str]) -> Optional[str]:
+        """Get pre-defined Cypher template for common queries"""
+        return CYPHER_TEMPLATES.get(intent)
+
+    def process_query(self, query: str, use_templates: bool = True) -> Tuple[str, Dict, Dict]:
+        """Complete query processing pipeline, reusing the plan for a repeated question
+        
+        Returns:
+            Cypher query, query understanding, and the parameters to run the query with
+        """
+        key = self._plan_key(query, use_templates)
+        with self._plan_lock:
+            entry = self._plan_cache.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._plan_cache[key]
+                entry = None
+            if entry is not None:
+                self._plan_cache.move_to_end(key)
+                if entry[1]:
+                    self.fallback_plan_hits += 1
+        if entry is not None:
+            _, is_fallback, (cypher_query, understanding, parameters) = entry
+            if is_fallback:
+                logger.info("Using cached fallback plan (question failed recently)")
+            else:
+                logger.info("Using cached Cypher plan")
+            return cypher_query, copy.deepcopy(understanding), dict(parameters)
+        
+        cypher_query, understanding, parameters, cache_for = self._plan_query(query, use_templates)
+        
+        if cache_for > 0:
+            with self._plan_lock:
+                self._plan_cache[key] = (
+                    time.monotonic() + cache_for,
+                    cache_for < self.PLAN_TTL,
+                    (cypher_query, copy.deepcopy(understanding), dict(parameters))
+                )
+                self._plan_cache.move_to_end(key)
+                if len(self._plan_cache) > self.PLAN_CACHE_SIZE:
+                    self._plan_cache.popitem(last=False)
+        
+        return cypher_query, understanding, parameters
+    
+    def invalidate_plan(self, query: str, use_templates: bool = True):
+        """Drop the cached plan for a query, e.g. after it failed to execute"""
+        with self._plan_lock:
+            self._plan_cache.pop(self._plan_key(query, use_templates), None)
+    
+    def _plan_key(self, query: str, use_templates: bool) -> Tuple[str, bool]:
+        """Plan cache key, ignoring case and whitespace differences"""
+        return " ".join(query.lower().split()), use_templates
+    
+    def _plan_query(self, query: str, use_templates: bool) -> Tuple[str, Dict, Dict, float]:
+        """Understand a query and produce its Cypher and parameters, plus how many seconds the plan may be cached"""
+        # Templates are chosen from the understanding, so only the template-free
+        # path can get both from one LLM call; a failed call falls back to two
+        plan = None if use_templates else self.understand_and_generate(query)
+        if plan is not None:
+            cypher_query, understanding = plan
+        else:
+            cypher_query, understanding = None, self.understand_query(query)
         
         # Ensure understanding has all required fields with defaults
-        understanding.setdefault('complexity', 'medium')
-        understanding.setdefault('graph_pattern', 'simple')
-        understanding.setdefault('data_focus', ['warehouses'])
-        understanding.setdefault('time_scope', 'current')
-        understanding.setdefault('requires_comparison', False)
-        understanding.setdefault('requires_aggregation', False)
-        understanding.setdefault('requires_temporal_analysis', False)
-        understanding.setdefault('requires_geospatial_analysis', False)
-        understanding.setdefault('output_format', 'summary')
-        understanding.setdefault('filters', [])
+        for key, value in UNDERSTANDING_DEFAULTS.items():
+            if key not in understanding:
+                understanding[key] = copy.copy(value)
+        
+        # A failed understanding call is transient and never cached; a reply that
+        # did not parse is likely to fail again, so its plan is kept for a while
+        intent = understanding.get('intent', '')
+        if intent == 'error':
+            cache_for = 0
+        elif intent == 'general_query':
+            cache_for = self.FALLBACK_PLAN_TTL
+        else:
+            cache_for = self.PLAN_TTL
         
         if use_templates:
-            intent = understanding.get('intent', '')
             template = self.get_template_query(intent, understanding.get('entities', []))
+            alias = self.INTENT_TEMPLATES.get(intent)
+            if (not template
+                    and alias is not None
+                    and alias[1].search(query)
+                    and not understanding.get('filters')
+                    and not self._names_specific_entities(query, understanding)):
+                template = self.get_template_query(alias[0], understanding.get('entities', []))
             if template:
-                logger.info(f"Using template for intent: {intent}")
-                return template.strip(), understanding
+                logger.info("Using template for intent: {}", intent)
+                return template, understanding, {}, cache_for
         
         # Try to generate custom Cypher
-        cypher_query = self.generate_cypher(query, understanding)
+        if cypher_query is None:
+            cypher_query = self.generate_cypher(query, understanding)
         
         # Validate the generated query
         if cypher_query and self._validate_cypher_syntax(cypher_query):
-            return cypher_query, understanding
+            return cypher_query, understanding, {}, cache_for
         else:
-            # Fallback to a basic exploration query
+            # Fallback to a basic exploration query; retried at once if the LLM
+            # call itself failed (None), otherwise after FALLBACK_PLAN_TTL
             logger.warning("Generated query failed validation, using fallback")
-            fallback_query = self._generate_fallback_query(understanding)
-            return fallback_query, understanding
+            fallback_query, parameters = self._generate_fallback_query(understanding)
+            if cypher_query is not None:
+                cache_for = min(cache_for, self.FALLBACK_PLAN_TTL)
+            else:
+                cache_for = 0
+            return fallback_query, understanding, parameters, cache_for
+    
+    def _names_specific_entities(self, query: str, understanding: Dict) -> bool:
+        """Whether the question or its entities name particular warehouses, managers or zones"""
+        entities = [str(e) for e in understanding.get('entities', [])]
+        if any(any(ch.isdigit() for ch in entity) for entity in entities):
+            return True
+        return bool(self.ENTITY_ID_PATTERN.search(" ".join([query] + entities)))
+    
+    def _check_cypher_prefix(self, text: str) -> Optional[bool]:
+        """Whether streamed text opens like a query _validate_cypher_syntax accepts; None if too short to tell"""
+        head = text.lstrip().lstrip("`").lstrip()
+        if head[:6].lower() == "cypher":
+            head = head[6:].lstrip()
+        head = head.upper()
+        
+        if head.startswith(self.CYPHER_PREFIXES):
+            return True
+        if "CYPHER".startswith(head) or any(prefix.startswith(head) for prefix in self.CYPHER_PREFIXES):
+            return None
+        return False
     
     def _validate_cypher_syntax(self, cypher_query: str) -> bool:
         """Basic validation of Cypher query syntax"""
@@ -427,7 +760,7 @@ class QueryGenerator:
             # Check for basic syntax issues
             if not cypher_query.strip():
                 return False
-            if not cypher_query.upper().startswith(('MATCH', 'CREATE', 'MERGE')):
+            if not cypher_query.upper().startswith(self.CYPHER_PREFIXES):
                 return False
             if 'RETURN' not in cypher_query.upper():
                 return False
@@ -435,8 +768,8 @@ class QueryGenerator:
         except Exception:
             return False
     
-    def _generate_fallback_query(self, understanding: Dict) -> str:
-        """Generate a safe fallback query based on understanding"""
+    def _generate_fallback_query(self, understanding: Dict) -> Tuple[str, Dict]:
+        """Generate a safe fallback query and its parameters based on understanding"""
         intent = understanding.get('intent', 'exploration')
         entities = understanding.get('entities', [])
         
@@ -448,17 +781,19 @@ class QueryGenerator:
             RETURN w.warehouse_id, w.risk_score, w.location_type, COUNT(r) as risk_events
             ORDER BY w.risk_score DESC
             LIMIT 10
-            """
+            """, {}
         elif 'warehouse' in entities or any('WH_' in str(e) for e in entities):
             warehouse_id = next((e for e in entities if 'WH_' in str(e)), 'WH_0001')
-            return f"""
-            MATCH (w:Warehouse {{warehouse_id: '{warehouse_id}'}})
+            # Bound as a parameter: the ID comes from LLM output, and one fixed
+            # statement lets Neo4j reuse its plan for every warehouse
+            return """
+            MATCH (w:Warehouse {warehouse_id: $warehouse_id})
             OPTIONAL MATCH (w)-[:HAS_INFRASTRUCTURE]->(i:Infrastructure)
             OPTIONAL MATCH (w)-[:EXPERIENCED]->(r:RiskEvent)
             RETURN w.warehouse_id, w.risk_score, w.location_type,
                    i.has_temp_regulation, i.has_electric_backup, i.is_flood_proof,
                    COUNT(r) as risk_events
-            """
+            """, {"warehouse_id": str(warehouse_id)}
         else:
             return """
             MATCH (w:Warehouse)
@@ -466,9 +801,11 @@ class QueryGenerator:
             RETURN w.warehouse_id, w.location_type, w.capacity_size, z.zone_name, w.risk_score
             ORDER BY w.risk_score DESC
             LIMIT 20
-            """
+            """, {}
 
 if __name__ == "__main__":
+    Config.ensure_valid()
+    
     generator = QueryGenerator()
     test_queries = [
         # Risk Analysis
@@ -519,15 +856,26 @@ if __name__ == "__main__":
 
     print(f"Testing {len(test_queries)} different query types...")
     
-    for i, query in enumerate(test_queries, 1):
-        print(f"\n{'='*80}")
-        print(f"Test {i}: {query}")
-        print(f"{'='*80}")
+    # Each test is two Groq round trips, so run them concurrently and print
+    # each one as it finishes
+    with ThreadPoolExecutor(max_workers=max(1, Config.BATCH_CONCURRENCY)) as pool:
+        futures = {
+            pool.submit(generator.process_query, query): (i, query)
+            for i, query in enumerate(test_queries, 1)
+        }
         
-        try:
-            cypher, understanding = generator.process_query(query)
-            print(f"Intent: {understanding.get('intent', 'unknown')}")
-            print(f"Entities: {understanding.get('entities', [])}")
-            print(f"Cypher Query:\n{cypher}")
-        except Exception as e:
-            print(f"Error processing query: {e}")
\ No newline at end of file
+        for future in as_completed(futures):
+            i, query = futures[future]
+            print(f"\n{'='*80}")
+            print(f"Test {i}/{len(test_queries)}: {query}")
+            print(f"{'='*80}")
+            
+            try:
+                cypher, understanding, parameters = future.result()
+                print(f"Intent: {understanding.get('intent', 'unknown')}")
+                print(f"Entities: {understanding.get('entities', [])}")
+                print(f"Cypher Query:\n{cypher}")
+                if parameters:
+                    print(f"Parameters: {parameters}")
+            except Exception as e:
+                print(f"Error processing query: {e}")
\ No newline at end of file
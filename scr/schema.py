@@ -76,5 +76,6 @@ CYPHER_SCHEMA = {
         "CREATE INDEX warehouse_capacity IF NOT EXISTS FOR (w:Warehouse) ON (w.capacity_size)",
         "CREATE INDEX risk_event_type IF NOT EXISTS FOR (r:RiskEvent) ON (r.event_type)",
         "CREATE INDEX warehouse_location IF NOT EXISTS FOR (w:Warehouse) ON (w.location_type)",
+        "CREATE INDEX warehouse_risk_score IF NOT EXISTS FOR (w:Warehouse) ON (w.risk_score)",
     ]
 }
\ No newline at end of file